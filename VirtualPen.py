@@ -4,40 +4,151 @@
 Virtual Pen App with Interactive Canvas
 """
 
-# Importar los paquetes necesarios
-from collections import deque
-from imutils.video import VideoStream
-import numpy as np
-import cv2
-import imutils
+# Importar los paquetes necesarios; lo liviano primero para mostrar la ventana enseguida
 import time
-import tkinter as tk
-from tkinter import Canvas
+_t_start = time.perf_counter()
+import argparse
+from collections import deque
+import sys
 import threading
-from maze_game import MazeGame
-
+import tkinter as tk
+from tkinter import Canvas, messagebox
+from stroke_model import StrokeModel
+from event_bus import (EventBus, TkBridge, PenMoved, StrokeEnded, CanvasCleared, RangeChanged,
+                       MazeStarted, MazeCollision, MazeFinished, VisionLoaded, StreamFailed)
+from hsv_profile import load_profile, save_profile, PROFILE_PATH
+
+# Módulos de visión (OpenCV, NumPy, imutils y los que dependen de ellos):
+# load_vision los carga en segundo plano la primera vez que se necesitan
+cv2 = np = tracker = None
+vision_ready = threading.Event()
+vision_thread = None
+vision_waiting = []  # Funciones que esperan a que termine la carga
+
+
+def get_arguments(argv=None):
+    # Fuente de video: número de cámara, ruta de un video o "synthetic"
+    ap = argparse.ArgumentParser()
+    ap.add_argument('-s', '--source', default='0',
+                    help='Camera index, video file or "synthetic"')
+    ap.add_argument('-r', '--record', help='Append the session to this file')
+    ap.add_argument('-p', '--profile', default=PROFILE_PATH,
+                    help='HSV range profile loaded at startup and saved after calibrating')
+    ap.add_argument('--hud', action='store_true',
+                    help='Show per-stage timings over the video')
+    ap.add_argument('--perf-dump', metavar='FILE',
+                    help='Time every stage and write the percentiles to FILE (.json or .csv) on exit')
+    ap.add_argument('--server', metavar='HOST:PORT',
+                    help='Draw the positions published by tracking_server.py instead of opening a camera')
+    ap.add_argument('--startup-check', type=float, metavar='MS',
+                    help='Print the startup time once the window is shown, then exit '
+                         '(with an error if it took longer than MS)')
+    return ap.parse_args(argv)
 
-# Configurar la ventana de Tkinter
-root = tk.Tk()
-root.title("Virtual Pen with Interactive Canvas")
-root.geometry("800x600")
 
 # Variables globales
+cli_args = None
+video_source = '0'
+recorder = None  # Grabación de la sesión (trazos y eventos del laberinto)
+root = None
+canvas = None
+stroke_model = None
 running = False
-pts = deque(maxlen=1024)
+pipeline = None
+video_thread = None
+pts = deque(maxlen=1024)  # load_vision lo recrea como Trail
 line_color = (0, 0, 255)
+roi_enabled = False
+lut_segmenter = None
+multi_enabled = False
+hud_enabled = False  # Copia de la casilla del HUD para el hilo de video, que no toca Tk
+# Se crean en load_vision
+multi_tracker = roi_tracker = motion_stage = trail_layer = calibration = None
+frame_buffers = None  # Buffers del hilo de video; se crean al iniciar la cámara
+coarse_fine = None  # Búsqueda en un cuadro reducido; None para segmentar a resolución completa
+
+# Bus de eventos entre el hilo de video, la pizarra, los laberintos y la grabación
+bus = EventBus()
+bridge = None  # Entrega los eventos en el hilo de Tk; se crea con la ventana
+pen_down = set()  # Lápices con un trazo en curso (hilo de video)
+clear_requested = threading.Event()
 
 # Definir límites de color en el espacio de color HSV (valores iniciales)
 greenLower = (100, 150, 50)
 greenUpper = (140, 255, 255)
+adaptive_range = None  # Ajuste en línea del rango; None si está desactivado
+adaptive_enabled = False  # Copia de la casilla de ajuste automático para el hilo de video
+
+# Opción del menú de búsqueda que segmenta todo el cuadro
+FULL_RESOLUTION = "Resolución completa"
 
 # Variables para el modo de dibujo en la pizarra
 drawing = False
 last_x, last_y = None, None
 
-# Inicializar la pizarra interactiva
-canvas = Canvas(root, width=600, height=400, bg="white")
-canvas.pack(pady=20)
+
+# Función para cargar el stack de visión (hilo de fondo)
+def load_vision():
+    global cv2, np, tracker, VideoStream, TrackingPipeline, STOP, RoiTracker
+    global MOTION_MODELS, MotionStage, Trail, TrailLayer, LutSegmenter, MultiPenTracker, ColorLabeler
+    global open_source, MazeEngine, WALL, REACHED, MazeImage, rasterize, START, GOAL, maze_generator
+    global GuidedCalibration, AdaptiveRange, PROFILER, FrameBuffers
+    global CoarseToFine, COARSE_PRESETS
+    global multi_tracker, roi_tracker, motion_stage, trail_layer, calibration, pts
+    import cv2
+    import numpy as np
+    from imutils.video import VideoStream
+    import tracker
+    from pipeline import TrackingPipeline, STOP
+    from roi_tracker import RoiTracker
+    from motion_model import MOTION_MODELS, MotionStage
+    from trail_renderer import Trail, TrailLayer
+    from lut_segmenter import LutSegmenter
+    from multi_pen import MultiPenTracker
+    from color_labeler import ColorLabeler
+    from frame_sources import open_source
+    from maze_engine import MazeEngine, WALL, GOAL as REACHED
+    from maze_render import MazeImage, rasterize, START, GOAL
+    import maze_generator
+    from color_calibration import GuidedCalibration, AdaptiveRange
+    from profiler import PROFILER
+    from frame_buffers import FrameBuffers
+    from coarse_to_fine import CoarseToFine, PRESETS as COARSE_PRESETS
+
+    if cli_args is not None and (cli_args.perf_dump or cli_args.hud):
+        PROFILER.enable(cli_args.perf_dump)
+    multi_tracker = MultiPenTracker(ColorLabeler())
+    multi_tracker.segmenter.set_range("pen", greenLower, greenUpper)
+    roi_tracker = RoiTracker()
+    motion_stage = MotionStage()
+    trail_layer = TrailLayer()
+    calibration = GuidedCalibration()
+    pts = Trail()
+    vision_ready.set()
+    bus.publish(VisionLoaded())
+
+# Función para ejecutar algo que necesita el stack de visión (hilo de Tk)
+def with_vision(function, *args):
+    global vision_thread
+    if vision_ready.is_set():
+        function(*args)
+        return
+    vision_waiting.append((function, args))
+    if vision_thread is None:
+        start_button.config(text="Cargando...")
+        vision_thread = threading.Thread(target=load_vision, daemon=True)
+        vision_thread.start()
+
+# Función que corre lo que esperaba la carga (hilo de Tk)
+def on_vision_loaded():
+    start_button.config(text="Iniciar")
+    fill_motion_menu()
+    motion_menu.config(state="normal")
+    fill_coarse_menu()
+    coarse_menu.config(state="normal")
+    while vision_waiting:
+        function, args = vision_waiting.pop(0)
+        function(*args)
 
 # Función para manejar el dibujo en la pizarra
 def start_drawing(event):
@@ -58,26 +169,49 @@ def draw_on_canvas(event):
         canvas.create_line(last_x, last_y, event.x, event.y, fill=line_color, width=2)
         last_x, last_y = event.x, event.y
 
-# Función para sincronizar el lápiz virtual con la pizarra
-def draw_virtual_on_canvas(center):
+# Función para sincronizar el lápiz virtual con la pizarra (hilo de video)
+def draw_virtual_on_canvas(center, color=None, pen=0):
     if center is not None:
-        x, y = center
-        hex_color = rgb_to_hex(line_color)  # Convertir el color RGB a hexadecimal
-        canvas.create_oval(x - 2, y - 2, x + 2, y + 2, fill=hex_color)
-
-# Configuración de eventos de la pizarra
-canvas.bind("<ButtonPress-1>", start_drawing)
-canvas.bind("<B1-Motion>", draw_on_canvas)
-canvas.bind("<ButtonRelease-1>", stop_drawing)
+        hex_color = rgb_to_hex(color or line_color)  # Convertir el color RGB a hexadecimal
+        pen_down.add(pen)
+        bus.publish(PenMoved(center, hex_color, pen))
+    elif pen in pen_down:
+        # Sólo el primer cuadro sin lápiz termina el trazo
+        pen_down.discard(pen)
+        bus.publish(StrokeEnded(pen))
+
+# Función para borrar los trazos del canvas (hilo de Tk)
+def clear_canvas():
+    stroke_model.clear()
+    canvas.delete("all")  # Borra todo del canvas
 
 # Función para iniciar el flujo de video
 def start_stream():
-    global running
+    global running, pipeline, video_thread
+    # No iniciar una segunda captura si ya hay una en curso
+    if video_thread is not None and video_thread.is_alive():
+        return
     running = True
-    thread = threading.Thread(target=run_video_stream)
+    pipeline = None
+    if cli_args.server:
+        thread = threading.Thread(target=run_server_client)
+    elif pipeline_mode.get():
+        thread = threading.Thread(target=run_pipeline)
+        root.after(1000, update_pipeline_status)
+    else:
+        thread = threading.Thread(target=run_video_stream)
+    video_thread = thread
     thread.start()
 
 
+# Función del botón Iniciar: el cliente del servidor sólo usa sockets y no carga OpenCV
+def request_stream():
+    if cli_args.server:
+        start_stream()
+    else:
+        with_vision(start_stream)
+
+
 # Función para cambiar el color de la línea
 def set_line_color(color):
     global line_color
@@ -85,8 +219,12 @@ def set_line_color(color):
 
 # Función para borrar la pantalla
 def clear_screen():
-    pts.clear()  # Limpia el deque
-    canvas.delete("all")  # Borra todo del canvas
+    if video_thread is not None and video_thread.is_alive():
+        # El hilo de video es dueño de pts: le pedimos que lo limpie
+        clear_requested.set()
+    else:
+        pts.clear()  # Limpia el deque
+        bus.publish(CanvasCleared())
 
 # Función para actualizar el rango de color HSV
 def update_color_range():
@@ -100,6 +238,120 @@ def update_color_range():
         )
     except ValueError:
         print("Por favor ingresa valores válidos para el rango de color.")
+        return
+    apply_color_range(greenLower, greenUpper)
+    with_vision(toggle_adaptive_mode)
+
+# Función para aplicar un rango de color nuevo (desde cualquier hilo)
+def apply_color_range(lower, upper):
+    global greenLower, greenUpper
+    greenLower, greenUpper = tuple(lower), tuple(upper)
+    if lut_segmenter is not None:
+        lut_segmenter.set_range("pen", greenLower, greenUpper)
+    if multi_tracker is not None:
+        # El rango calibrado también entra en la unión del modo multi-lápiz
+        multi_tracker.segmenter.set_range("pen", greenLower, greenUpper)
+
+# Función para mostrar en los campos un rango calculado automáticamente (hilo de Tk)
+def show_color_range(lower, upper):
+    entries = (hue_low_entry, sat_low_entry, val_low_entry, hue_high_entry, sat_high_entry, val_high_entry)
+    for entry, value in zip(entries, tuple(lower) + tuple(upper)):
+        entry.delete(0, tk.END)
+        entry.insert(0, value)
+
+# Función para calibrar con el marcador dentro del recuadro guía
+def start_calibration():
+    calibration.start()
+
+# Función para activar o desactivar el ajuste del rango según la iluminación
+def toggle_adaptive_mode():
+    global adaptive_enabled
+    adaptive_enabled = adaptive_mode.get()
+    reset_adaptive_range()
+
+# Función para reiniciar el ajuste desde el rango actual (desde cualquier hilo)
+def reset_adaptive_range():
+    global adaptive_range
+    adaptive_range = AdaptiveRange(greenLower, greenUpper) if adaptive_enabled else None
+
+# Función para usar el rango que entregó la calibración (hilo de video)
+def finish_calibration(lower, upper):
+    apply_color_range(lower, upper)
+    reset_adaptive_range()
+    save_profile(lower, upper, cli_args.profile, method=calibration.method)
+    bus.publish(RangeChanged(lower, upper))
+
+# Función para activar o desactivar la segmentación por tabla de consulta
+def toggle_lut_mode():
+    global lut_segmenter
+    if lut_mode.get():
+        segmenter = LutSegmenter()
+        segmenter.set_range("pen", greenLower, greenUpper)
+        lut_segmenter = segmenter
+    else:
+        lut_segmenter = None
+
+# Función para activar o desactivar la búsqueda por región de interés
+def toggle_roi_mode():
+    global roi_enabled
+    roi_enabled = roi_mode.get()
+    roi_tracker.reset()
+
+# Función para elegir el modelo de movimiento del lápiz
+def set_motion_model(name):
+    global motion_stage
+    model = MOTION_MODELS[name]
+    motion_stage = MotionStage(model() if model else None)
+
+# Función para elegir cuánto se reduce el cuadro antes de buscar el lápiz
+def set_coarse_mode(name):
+    global coarse_fine
+    preset = COARSE_PRESETS.get(name)
+    coarse_fine = CoarseToFine(**preset) if preset else None
+
+# Función para activar o desactivar el seguimiento de varios lápices
+def toggle_multi_mode():
+    global multi_enabled
+    multi_enabled = multi_mode.get()
+
+# Función para mostrar u ocultar los tiempos por etapa sobre el video
+def toggle_hud():
+    global hud_enabled
+    hud_enabled = hud_mode.get()
+    if hud_enabled:
+        PROFILER.enable()
+    elif not cli_args.perf_dump:
+        PROFILER.disable()
+
+# Función para dibujar los trazos como curvas suaves en vez de polilíneas
+def toggle_smooth():
+    stroke_model.set_smooth(smooth_mode.get())
+
+# Función para guardar los trazos de la pizarra en un archivo compacto
+def save_drawing():
+    from tkinter import filedialog
+    from stroke_store import save_strokes
+    path = filedialog.asksaveasfilename(defaultextension=".vpk", filetypes=[("Dibujo", "*.vpk")])
+    if not path:
+        return
+    try:
+        save_strokes(path, stroke_model.export())
+    except (OSError, ValueError) as e:
+        messagebox.showerror("Error", "No se pudo guardar el dibujo: %s" % e)
+
+# Función para abrir un dibujo guardado sobre la pizarra
+def open_drawing():
+    from tkinter import filedialog
+    from stroke_store import load_strokes
+    path = filedialog.askopenfilename(filetypes=[("Dibujo", "*.vpk")])
+    if not path:
+        return
+    try:
+        strokes = load_strokes(path)
+    except (OSError, ValueError) as e:
+        messagebox.showerror("Error", "No se pudo abrir el dibujo: %s" % e)
+        return
+    stroke_model.load([(pen, rgb_to_hex(color), points.tolist()) for pen, color, points in strokes])
 
 # Función para cerrar la aplicación
 def close_app():
@@ -107,81 +359,223 @@ def close_app():
     running = False
     root.quit()
 
-# Función principal para el procesamiento del video
-def run_video_stream():
-    global running
-    vs = VideoStream(src=0).start()
-    time.sleep(2.0)
-
-    while running:
-        frame = vs.read()
-        frame = cv2.flip(frame, 1)
-        frame = imutils.resize(frame, width=600)
-        blurred = cv2.GaussianBlur(frame, (11, 11), 0)
-        hsv = cv2.cvtColor(blurred, cv2.COLOR_BGR2HSV)
-
-        mask = cv2.inRange(hsv, greenLower, greenUpper)
-        mask = cv2.erode(mask, None, iterations=2)
-        mask = cv2.dilate(mask, None, iterations=2)
-
-        cnts = cv2.findContours(mask.copy(), cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-        cnts = imutils.grab_contours(cnts)
-        center = None
-
-        if len(cnts) > 0:
-            c = max(cnts, key=cv2.contourArea)
-            ((x, y), radius) = cv2.minEnclosingCircle(c)
-            M = cv2.moments(c)
-            center = (int(M["m10"] / M["m00"]), int(M["m01"] / M["m00"]))
-
+# Función para obtener la máscara del color del lápiz
+def segment_region(region):
+    segmenter = lut_segmenter
+    if segmenter is not None:
+        return frame_buffers.segment_lut(region, segmenter, "pen")
+    return frame_buffers.segment(region, greenLower, greenUpper)
+
+# Función para obtener la máscara sin limpiar, para el cuadro reducido
+def threshold_region(region):
+    segmenter = lut_segmenter
+    if segmenter is not None:
+        return segmenter.mask(region, "pen")
+    return tracker.threshold(region, greenLower, greenUpper)
+
+# Función para encontrar el centro del lápiz en el cuadro
+def locate_pen(frame):
+    def find(region):
+        searcher = coarse_fine
+        if searcher is not None:
+            return searcher.locate(region, threshold_region, segment_region)
+        return frame_buffers.find_center(segment_region(region))
+
+    if roi_enabled:
+        return roi_tracker.locate(frame, find)
+    return find(frame)
+
+# Función para procesar un cuadro: un lápiz, o todos en modo multi-lápiz
+def track_frame(frame):
+    if multi_enabled:
+        mask = frame_buffers.segment_lut(frame, multi_tracker.segmenter, None)
+        return None, multi_tracker.detect(frame, mask)
+    return locate_pen(frame), None
+
+# Función para asignar y dibujar todos los lápices detectados
+def render_pens(frame, detections):
+    pens = multi_tracker.assign(*detections)
+    multi_tracker.render(frame)
+    for pen in pens:
+        draw_virtual_on_canvas(pen.pts[0], pen.color[::-1], pen.slot + 1)  # BGR -> RGB
+
+# Función para dibujar la estela y sincronizar con la pizarra
+def render_frame(frame, center, t_capture, detections=None):
+    if clear_pending():
+        multi_tracker.clear()
+
+    if calibration.active:
+        fitted = calibration.feed(frame)
+        if fitted is not None:
+            finish_calibration(*fitted)
+        else:
+            calibration.draw(frame)
+
+    if detections is not None:
+        render_pens(frame, detections)
+    else:
+        adapted = adaptive_range.observe(frame, center) if adaptive_range is not None else None
+        if adapted is not None:
+            apply_color_range(*adapted)
+            bus.publish(RangeChanged(*adapted))
+        center = motion_stage.process(center, t_capture, time.perf_counter())
         pts.appendleft(center)
 
         # Dibujar las líneas del lápiz virtual
-        for i in range(1, len(pts)):
-            if pts[i - 1] is None or pts[i] is None:
-                continue
-            thickness = int(np.sqrt(1024 / float(i + 1)) * 2.5)
-            cv2.line(frame, pts[i - 1], pts[i], line_color, thickness)
+        with PROFILER.section("estela"):
+            trail_layer.render(frame, pts, line_color)
 
         # Sincronizar con la pizarra
-        if center:
-            draw_virtual_on_canvas(center)
+        draw_virtual_on_canvas(center)
 
+    if hud_enabled:
+        PROFILER.draw_hud(frame)
+    with PROFILER.section("imshow"):
         cv2.imshow("Virtual Pen", frame)
         key = cv2.waitKey(1) & 0xFF
+    PROFILER.frame_done()
+    return key
+
+# Función para abrir la fuente de video del modo en serie
+def open_video(source):
+    if source.isdigit():
+        vs = VideoStream(src=int(source)).start()
+        time.sleep(2.0)
+        return vs.read, vs.stop
+
+    frames = open_source(source, loop=True)
+
+    def read():
+        # Las fuentes de archivo o sintéticas escriben en el buffer crudo
+        item = frames.read(frame_buffers.raw_buffer())
+        return item[0] if item is not None else None
+    return read, frames.release
+
+# Cuadros preparados del pipeline: a lo sumo uno en captura, uno por cola y uno por etapa
+PIPELINE_SLOTS = 8
+
+# Función principal para el procesamiento del video
+def run_video_stream():
+    global running, frame_buffers
+    frame_buffers = FrameBuffers()
+    read, release = open_video(video_source)
+
+    while running:
+        t_capture = time.perf_counter()
+        with PROFILER.section("captura"):
+            raw = read()
+        if raw is None:
+            break
+        frame = frame_buffers.prepare(raw)
+        with PROFILER.section("seguimiento"):
+            center, detections = track_frame(frame)
+
+        key = render_frame(frame, center, t_capture, detections)
         if key == ord("q"):
             break
 
-    vs.stop()
+    release()
     cv2.destroyAllWindows()
-    
-def start_maze_game():
-    """Lanza la ventana del laberinto."""
-    maze_window = tk.Toplevel(root)  # Crea una nueva ventana secundaria
-    maze_window.title("Laberinto")
-    MazeGame(maze_window, virtual_pen_callback=None)  # Inicia el laberinto en la nueva ventana
-
-# Función para obtener la posición del lápiz virtual
-def virtual_pen_callback():
-    if pts and pts[0] is not None:
-        return pts[0]
-    return (0, 0)
 
-#!/usr/bin/env python3
-# -*- coding: utf-8 -*-
-"""
-Virtual Pen App with Interactive Maze Game
-"""
+# Función para el procesamiento del video en etapas paralelas
+def run_pipeline():
+    global pipeline, frame_buffers
+    # Cada cuadro preparado vuelve a la lista libre cuando termina de dibujarse o
+    # cuando una cola lo descarta; nunca se reescribe mientras alguien lo usa
+    frame_buffers = FrameBuffers(slots=PIPELINE_SLOTS)
+    frames = open_source(video_source, loop=True)
+
+    def capture(_):
+        with PROFILER.section("captura"):
+            item = frames.read(frame_buffers.raw_buffer())
+        if item is None:
+            # La cámara aún no entrega cuadros; no hace falta esperar a ciegas
+            time.sleep(0.01)
+            return None
+        out = frame_buffers.acquire(item[0].shape, timeout=0.1)
+        if out is None:
+            # Todos los cuadros siguen en uso: se descarta esta captura
+            return None
+        return time.perf_counter(), frame_buffers.prepare(item[0], out=out)
+
+    def segment(item):
+        t_capture, frame = item
+        with PROFILER.section("seguimiento"):
+            return (t_capture, frame) + track_frame(frame)
+
+    def render(item):
+        t_capture, frame, center, detections = item
+        try:
+            if not running or render_frame(frame, center, t_capture, detections) == ord("q"):
+                return STOP
+        finally:
+            frame_buffers.release(frame)
+        return item
+
+    def dropped(item):
+        frame_buffers.release(item[1])
+
+    pipeline = TrackingPipeline(capture, segment, render, on_drop=dropped).start()
+    while running and not pipeline.wait(0.1):
+        pass
+
+    pipeline.stop()
+    pipeline.join(1.0)
+    print(pipeline.report())
+    frames.release()
+    cv2.destroyAllWindows()
+
+# Función para atender "Borrar" desde el hilo que es dueño de pts
+def clear_pending():
+    if not clear_requested.is_set():
+        return False
+    clear_requested.clear()
+    pts.clear()
+    bus.publish(CanvasCleared())
+    return True
+
+# Función para dibujar las posiciones de un servidor de seguimiento (un lápiz por cámara)
+def run_server_client():
+    global running
+    from tracking_server import TrackingClient, parse_address
+    client = None
+    try:
+        client = TrackingClient(parse_address(cli_args.server))
+        for update in client.updates(timeout=0.5):
+            if not running:
+                break
+            clear_pending()
+            if update is None:
+                continue
+            camera, _, _, position = update
+            center = None if position is None else (int(round(position[0])), int(round(position[1])))
+            draw_virtual_on_canvas(center, pen=camera)
+    except (OSError, ValueError) as e:
+        # Servidor caído, dirección equivocada o conexión cortada: avisar en el hilo de Tk
+        bus.publish(StreamFailed("Servidor de seguimiento %s: %s" % (cli_args.server, e)))
+    finally:
+        running = False
+        clear_pending()
+        if client is not None:
+            client.close()
+
+# Función para mostrar el rendimiento del pipeline en la ventana
+def update_pipeline_status():
+    if pipeline is not None:
+        pipeline_status.config(text=pipeline.report())
+        if pipeline.stop_event.is_set():
+            return
+    if running:
+        root.after(1000, update_pipeline_status)
+
+# Niveles en el orden de los botones; el índice identifica el nivel en la grabación
+MAZE_LEVELS = ("easy 1", "easy 2", "medium 1", "medium 2", "hard 2", "hard 1", "random")
 
-import cv2
-import numpy as np
-import tkinter as tk
-from tkinter import messagebox
 
 class MazeGame:
-    def __init__(self, master, virtual_pen_callback, level="easy"):
+    def __init__(self, master, bridge, level="easy"):
         self.master = master
-        self.virtual_pen_callback = virtual_pen_callback
+        self.bridge = bridge
         self.level = level  # Determina el nivel del laberinto (easy, medium, hard)
 
         # Configurar el canvas para mostrar el laberinto
@@ -198,14 +592,23 @@ class MazeGame:
         # Inicializar la posición actual del lápiz
         self.current_position = [self.start[0] * self.cell_size, self.start[1] * self.cell_size]
         self.draw_cursor()
+        bus.publish(MazeStarted(self.level, tuple(self.current_position)))
 
-        # Iniciar el bucle de detección
+        # Revisar colisiones sólo cuando llega una posición nueva; si llegan varias
+        # juntas, la cola se queda con la última
         self.running = True
-        self.check_collision()
+        self.pen = None  # El laberinto sigue al primer lápiz que se mueve
+        self.subscription = self.bridge.subscribe(self.on_pen_moved, PenMoved, coalesce=True, maxsize=4)
+        self.canvas.bind("<Destroy>", lambda event: self.bridge.unsubscribe(self.subscription))
 
     def create_maze(self):
         """Dibuja el laberinto en el canvas según el nivel de dificultad."""
-        self.maze_image = np.ones((self.maze_size * self.cell_size, self.maze_size * self.cell_size, 3), dtype=np.uint8) * 255
+        if self.level == "random":
+            # Laberinto procedural: tamaño, inicio y meta salen del generador
+            grid, start, end, _, _ = maze_generator.generate_for_difficulty("medium", size=(15, 15))
+            self.maze_size = grid.shape[0]
+            self.cell_size = 400 // self.maze_size
+            self.start, self.end = start[::-1], end[::-1]  # (fila, columna) -> (x, y)
 
         # Define paredes para diferentes niveles de dificultad
         if self.level == "easy 1":
@@ -271,17 +674,22 @@ class MazeGame:
                     (7, 0), (7, 4), 
             ]
 
-        # Dibujar las paredes del laberinto
-        for i, j in walls:
-            x1, y1 = i * self.cell_size, j * self.cell_size
-            x2, y2 = x1 + self.cell_size, y1 + self.cell_size
-            self.canvas.create_rectangle(x1, y1, x2, y2, fill="black")
+        elif self.level == "random":
+            walls = maze_generator.walls_list(grid)
+
+        # El motor guarda la rejilla y aplica las reglas; esta ventana sólo dibuja
+        self.engine = MazeEngine.from_walls(walls, self.maze_size, self.cell_size, self.start, self.end)
 
-        # Dibujar inicio y final
-        start_x, start_y = self.start[0] * self.cell_size, self.start[1] * self.cell_size
-        end_x, end_y = self.end[0] * self.cell_size, self.end[1] * self.cell_size
-        self.canvas.create_rectangle(start_x, start_y, start_x + self.cell_size, start_y + self.cell_size, fill="green")
-        self.canvas.create_rectangle(end_x, end_y, end_x + self.cell_size, end_y + self.cell_size, fill="red")
+        # Campo de distancias a la meta; también confirma que la meta se puede alcanzar
+        if self.engine.distance[self.engine.start] < 0:
+            print("Advertencia: el laberinto %s no tiene solución." % self.level)
+
+        # Dibujar paredes, inicio y final en la imagen y mostrarla como un solo ítem
+        cells = self.engine.grid.astype(np.uint8)
+        cells[self.start[1], self.start[0]] = START
+        cells[self.end[1], self.end[0]] = GOAL
+        self.maze_image = rasterize(cells, self.cell_size)
+        self.maze_view = MazeImage(self.canvas, self.maze_image)
 
     def draw_cursor(self):
         """Dibuja el cursor actual en el canvas."""
@@ -294,160 +702,342 @@ class MazeGame:
         self.canvas.coords(self.cursor, self.current_position[0], self.current_position[1],
                            self.current_position[0] + 10, self.current_position[1] + 10)
 
-    def check_collision(self):
+    def on_pen_moved(self, event):
+        if self.pen is None:
+            self.pen = event.pen
+        if event.pen == self.pen:
+            self.check_collision(event.position)
+
+    def check_collision(self, position):
         """Verifica si el cursor toca una pared o llega al final."""
         if not self.running:
             return
 
-        # Obtener la posición actual del lápiz virtual
-        position = self.virtual_pen_callback()
-        if position:
-            self.update_cursor(position)
-
-            # Convertir las coordenadas a índices del laberinto
-            x, y = self.current_position[0] + 5, self.current_position[1] + 5
-            i, j = x // self.cell_size, y // self.cell_size
-
-            # Verificar si toca una pared
-            if self.canvas.find_overlapping(x, y, x, y):
-                overlapping_items = self.canvas.find_overlapping(x, y, x, y)
-                for item in overlapping_items:
-                    color = self.canvas.itemcget(item, "fill")
-                    if color == "black":
-                        messagebox.showerror("Error", "¡Te chocaste con una pared! Intenta de nuevo.")
-                        self.reset_game()
-                        return
-
-            # Verificar si llegó al final
-            if (i, j) == self.end:
-                messagebox.showinfo("Victoria", "¡Llegaste a la meta! Felicitaciones.")
-                self.running = False
-                return
-
-        self.master.after(50, self.check_collision)
+        # Mover el cursor a la nueva posición del lápiz virtual
+        self.update_cursor(position)
+
+        # El motor revisa todo el trayecto desde la lectura anterior
+        event = self.engine.step((position[0], position[1]))
+        # Los diálogos corren un bucle de eventos anidado que vuelve a vaciar el
+        # puente: se deja de atender al lápiz antes de mostrarlos
+        if event == WALL:
+            self.running = False
+            bus.publish(MazeCollision(self.level, tuple(position), self.engine.moves))
+            messagebox.showerror("Error", "¡Te chocaste con una pared! Intenta de nuevo.")
+            if self.canvas.winfo_exists():  # La ventana se pudo cerrar durante el diálogo
+                self.reset_game()
+            return
+
+        # Verificar si llegó al final
+        if event == REACHED:
+            self.running = False
+            self.bridge.unsubscribe(self.subscription)
+            bus.publish(MazeFinished(self.level, tuple(position), self.engine.moves))
+            messagebox.showinfo("Victoria", "¡Llegaste a la meta! Felicitaciones.")
 
     def reset_game(self):
         """Reinicia el juego."""
         self.current_position = [self.start[0] * self.cell_size, self.start[1] * self.cell_size]
+        self.engine.reset()
         self.canvas.coords(self.cursor, self.current_position[0], self.current_position[1],
                            self.current_position[0] + 10, self.current_position[1] + 10)
         self.running = True
-        self.check_collision()
 
 
-def start_maze_game(level, virtual_pen_callback):
+def start_maze_game(level):
     """Inicia el juego del laberinto con las coordenadas del lápiz virtual."""
-    maze_window = tk.Toplevel()
+    maze_window = tk.Toplevel(root)
     maze_window.title(f"Laberinto - Nivel {level.capitalize()}")
-    MazeGame(maze_window, virtual_pen_callback, level)
+    MazeGame(maze_window, bridge, level)
+
+
+# Función para construir la interfaz; no carga nada del stack de visión
+def build_ui():
+    global root, canvas, stroke_model, start_button, pipeline_mode, roi_mode, lut_mode, multi_mode
+    global motion_name, motion_menu, pipeline_status, adaptive_mode, hud_mode, coarse_name, coarse_menu, smooth_mode
+    global hue_low_entry, hue_high_entry, sat_low_entry, sat_high_entry, val_low_entry, val_high_entry
+
+    # Configurar la ventana de Tkinter
+    root = tk.Tk()
+    root.title("Virtual Pen with Interactive Canvas")
+    root.geometry("800x600")
+
+    # Inicializar la pizarra interactiva
+    canvas = Canvas(root, width=600, height=400, bg="white")
+    canvas.pack(pady=20)
+    stroke_model = StrokeModel(canvas)
+
+    # Configuración de eventos de la pizarra
+    canvas.bind("<ButtonPress-1>", start_drawing)
+    canvas.bind("<B1-Motion>", draw_on_canvas)
+    canvas.bind("<ButtonRelease-1>", stop_drawing)
+
+    # Botones para seleccionar el nivel del laberinto
+    frame_levels = tk.Frame(root)
+    frame_levels.pack(pady=10)
+
+    easy_button = tk.Button(frame_levels, text="Laberinto Nivel 1", command=lambda: with_vision(start_maze_game, "easy 1"))
+    easy_button.grid(row=0, column=0, padx=5)
 
+    medium_button = tk.Button(frame_levels, text="Laberinto Nivel 2", command=lambda: with_vision(start_maze_game, "easy 2"))
+    medium_button.grid(row=0, column=1, padx=5)
 
-# Botones para seleccionar el nivel del laberinto
-frame_levels = tk.Frame(root)
-frame_levels.pack(pady=10)
+    hard_button = tk.Button(frame_levels, text="Laberinto Nivel 3", command=lambda: with_vision(start_maze_game, "medium 1"))
+    hard_button.grid(row=0, column=2, padx=5)
 
-easy_button = tk.Button(frame_levels, text="Laberinto Nivel 1", command=lambda: start_maze_game("easy 1", virtual_pen_callback))
-easy_button.grid(row=0, column=0, padx=5)
+    easy_button = tk.Button(frame_levels, text="Laberinto Nivel 4", command=lambda: with_vision(start_maze_game, "medium 2"))
+    easy_button.grid(row=0, column=4, padx=5)
 
-medium_button = tk.Button(frame_levels, text="Laberinto Nivel 2", command=lambda: start_maze_game("easy 2", virtual_pen_callback))
-medium_button.grid(row=0, column=1, padx=5)
+    medium_button = tk.Button(frame_levels, text="Laberinto Nivel 5", command=lambda: with_vision(start_maze_game, "hard 2"))
+    medium_button.grid(row=0, column=5, padx=5)
 
-hard_button = tk.Button(frame_levels, text="Laberinto Nivel 3", command=lambda: start_maze_game("medium 1", virtual_pen_callback))
-hard_button.grid(row=0, column=2, padx=5)
+    hard_button = tk.Button(frame_levels, text="Laberinto Nivel 6", command=lambda: with_vision(start_maze_game, "hard 1"))
+    hard_button.grid(row=0, column=6, padx=5)
 
-easy_button = tk.Button(frame_levels, text="Laberinto Nivel 4", command=lambda: start_maze_game("medium 2", virtual_pen_callback))
-easy_button.grid(row=0, column=4, padx=5)
+    random_button = tk.Button(frame_levels, text="Laberinto Aleatorio", command=lambda: with_vision(start_maze_game, "random"))
+    random_button.grid(row=0, column=7, padx=5)
 
-medium_button = tk.Button(frame_levels, text="Laberinto Nivel 5", command=lambda: start_maze_game("hard 2", virtual_pen_callback))
-medium_button.grid(row=0, column=5, padx=5)
 
-hard_button = tk.Button(frame_levels, text="Laberinto Nivel 6", command=lambda: start_maze_game("hard 1", virtual_pen_callback))
-hard_button.grid(row=0, column=6, padx=5)
+    # Configuración de la interfaz gráfica
+    frame_buttons = tk.Frame(root)
+    frame_buttons.pack(pady=10)
 
+    start_button = tk.Button(frame_buttons, text="Iniciar", command=request_stream)
+    start_button.grid(row=0, column=0, padx=5)
 
-# Configuración de la interfaz gráfica
-frame_buttons = tk.Frame(root)
-frame_buttons.pack(pady=10)
+    clear_button = tk.Button(frame_buttons, text="Borrar", command=clear_screen)
+    clear_button.grid(row=0, column=1, padx=5)
 
-start_button = tk.Button(frame_buttons, text="Iniciar", command=start_stream)
-start_button.grid(row=0, column=0, padx=5)
+    close_button = tk.Button(frame_buttons, text="Cerrar", command=close_app)
+    close_button.grid(row=0, column=2, padx=5)
 
-clear_button = tk.Button(frame_buttons, text="Borrar", command=clear_screen)
-clear_button.grid(row=0, column=1, padx=5)
+    pipeline_mode = tk.BooleanVar(value=False)
+    pipeline_check = tk.Checkbutton(frame_buttons, text="Modo pipeline", variable=pipeline_mode)
+    pipeline_check.grid(row=0, column=3, padx=5)
 
-close_button = tk.Button(frame_buttons, text="Cerrar", command=close_app)
-close_button.grid(row=0, column=2, padx=5)
+    roi_mode = tk.BooleanVar(value=False)
+    roi_check = tk.Checkbutton(frame_buttons, text="Modo ROI", variable=roi_mode,
+                                   command=lambda: with_vision(toggle_roi_mode))
+    roi_check.grid(row=0, column=4, padx=5)
 
+    lut_mode = tk.BooleanVar(value=False)
+    lut_check = tk.Checkbutton(frame_buttons, text="Segmentación LUT", variable=lut_mode,
+                                   command=lambda: with_vision(toggle_lut_mode))
+    lut_check.grid(row=0, column=6, padx=5)
 
-frame_colors = tk.Frame(root)
-frame_colors.pack(pady=10)
+    multi_mode = tk.BooleanVar(value=False)
+    multi_check = tk.Checkbutton(frame_buttons, text="Multi-lápiz", variable=multi_mode, command=toggle_multi_mode)
+    multi_check.grid(row=0, column=7, padx=5)
 
-red_button = tk.Button(frame_colors, text="Rojo", bg="red", command=lambda: set_line_color((255, 0, 0)))
-red_button.grid(row=0, column=0, padx=5)
+    hud_mode = tk.BooleanVar(value=cli_args.hud)
+    hud_check = tk.Checkbutton(frame_buttons, text="Tiempos (HUD)", variable=hud_mode,
+                               command=lambda: with_vision(toggle_hud))
+    hud_check.grid(row=0, column=8, padx=5)
 
-blue_button = tk.Button(frame_colors, text="Azul", bg="blue", command=lambda: set_line_color((0, 0, 255)))
-blue_button.grid(row=0, column=1, padx=5)
+    motion_name = tk.StringVar(value="Sin filtro")
+    # Los modelos se agregan al menú cuando termina de cargar el stack de visión
+    motion_menu = tk.OptionMenu(frame_buttons, motion_name, "Sin filtro")
+    motion_menu.config(state="disabled")
+    motion_menu.grid(row=0, column=5, padx=5)
 
-green_button = tk.Button(frame_colors, text="Verde", bg="green", command=lambda: set_line_color((0, 255, 0)))
-green_button.grid(row=0, column=2, padx=5)
+    coarse_name = tk.StringVar(value=FULL_RESOLUTION)
+    # Los compromisos velocidad/precisión también llegan con el stack de visión
+    coarse_menu = tk.OptionMenu(frame_buttons, coarse_name, FULL_RESOLUTION)
+    coarse_menu.config(state="disabled")
+    coarse_menu.grid(row=0, column=9, padx=5)
 
-yellow_button = tk.Button(frame_colors, text="Amarillo", bg="yellow", command=lambda: set_line_color((255, 255, 0)))
-yellow_button.grid(row=0, column=3, padx=5)
+    smooth_mode = tk.BooleanVar(value=False)
+    smooth_check = tk.Checkbutton(frame_buttons, text="Suavizar", variable=smooth_mode, command=toggle_smooth)
+    smooth_check.grid(row=1, column=0, padx=5)
 
-brown_button = tk.Button(frame_colors, text="Café", bg="#8B4513", command=lambda: set_line_color((139, 69, 19)))
-brown_button.grid(row=0, column=4, padx=5)
+    save_button = tk.Button(frame_buttons, text="Guardar dibujo", command=save_drawing)
+    save_button.grid(row=1, column=1, padx=5)
 
-gray_button = tk.Button(frame_colors, text="Gris", bg="gray", command=lambda: set_line_color((128, 128, 128)))
-gray_button.grid(row=0, column=5, padx=5)
+    open_button = tk.Button(frame_buttons, text="Abrir dibujo", command=open_drawing)
+    open_button.grid(row=1, column=2, padx=5)
 
-purple_button = tk.Button(frame_colors, text="Morado", bg="purple", command=lambda: set_line_color((128, 0, 128)))
-purple_button.grid(row=0, column=6, padx=5)
+    pipeline_status = tk.Label(root, justify="left", font=("Courier", 9))
+    pipeline_status.pack()
 
-orange_button = tk.Button(frame_colors, text="Anaranjado", bg="orange", command=lambda: set_line_color((255, 165, 0)))
-orange_button.grid(row=0, column=7, padx=5)
 
-light_blue_button = tk.Button(frame_colors, text="Celeste", bg="#87CEEB", command=lambda: set_line_color((0, 255, 255)))
-light_blue_button.grid(row=0, column=8, padx=5)
+    frame_colors = tk.Frame(root)
+    frame_colors.pack(pady=10)
 
-black_button = tk.Button(frame_colors, text="Negro", bg="black", fg="white", command=lambda: set_line_color((0, 0, 0)))
-black_button.grid(row=0, column=9, padx=5)
+    red_button = tk.Button(frame_colors, text="Rojo", bg="red", command=lambda: set_line_color((255, 0, 0)))
+    red_button.grid(row=0, column=0, padx=5)
 
+    blue_button = tk.Button(frame_colors, text="Azul", bg="blue", command=lambda: set_line_color((0, 0, 255)))
+    blue_button.grid(row=0, column=1, padx=5)
 
-frame_color_range = tk.Frame(root)
-frame_color_range.pack(pady=10)
+    green_button = tk.Button(frame_colors, text="Verde", bg="green", command=lambda: set_line_color((0, 255, 0)))
+    green_button.grid(row=0, column=2, padx=5)
 
-tk.Label(frame_color_range, text="Hue Lower").grid(row=0, column=0)
-hue_low_entry = tk.Entry(frame_color_range, width=5)
-hue_low_entry.insert(0, greenLower[0])
-hue_low_entry.grid(row=0, column=1)
+    yellow_button = tk.Button(frame_colors, text="Amarillo", bg="yellow", command=lambda: set_line_color((255, 255, 0)))
+    yellow_button.grid(row=0, column=3, padx=5)
 
-tk.Label(frame_color_range, text="Hue Upper").grid(row=0, column=2)
-hue_high_entry = tk.Entry(frame_color_range, width=5)
-hue_high_entry.insert(0, greenUpper[0])
-hue_high_entry.grid(row=0, column=3)
+    brown_button = tk.Button(frame_colors, text="Café", bg="#8B4513", command=lambda: set_line_color((139, 69, 19)))
+    brown_button.grid(row=0, column=4, padx=5)
 
-tk.Label(frame_color_range, text="Saturation Lower").grid(row=1, column=0)
-sat_low_entry = tk.Entry(frame_color_range, width=5)
-sat_low_entry.insert(0, greenLower[1])
-sat_low_entry.grid(row=1, column=1)
+    gray_button = tk.Button(frame_colors, text="Gris", bg="gray", command=lambda: set_line_color((128, 128, 128)))
+    gray_button.grid(row=0, column=5, padx=5)
 
-tk.Label(frame_color_range, text="Saturation Upper").grid(row=1, column=2)
-sat_high_entry = tk.Entry(frame_color_range, width=5)
-sat_high_entry.insert(0, greenUpper[1])
-sat_high_entry.grid(row=1, column=3)
+    purple_button = tk.Button(frame_colors, text="Morado", bg="purple", command=lambda: set_line_color((128, 0, 128)))
+    purple_button.grid(row=0, column=6, padx=5)
 
-tk.Label(frame_color_range, text="Value Lower").grid(row=2, column=0)
-val_low_entry = tk.Entry(frame_color_range, width=5)
-val_low_entry.insert(0, greenLower[2])
-val_low_entry.grid(row=2, column=1)
+    orange_button = tk.Button(frame_colors, text="Anaranjado", bg="orange", command=lambda: set_line_color((255, 165, 0)))
+    orange_button.grid(row=0, column=7, padx=5)
 
-tk.Label(frame_color_range, text="Value Upper").grid(row=2, column=2)
-val_high_entry = tk.Entry(frame_color_range, width=5)
-val_high_entry.insert(0, greenUpper[2])
-val_high_entry.grid(row=2, column=3)
+    light_blue_button = tk.Button(frame_colors, text="Celeste", bg="#87CEEB", command=lambda: set_line_color((0, 255, 255)))
+    light_blue_button.grid(row=0, column=8, padx=5)
+
+    black_button = tk.Button(frame_colors, text="Negro", bg="black", fg="white", command=lambda: set_line_color((0, 0, 0)))
+    black_button.grid(row=0, column=9, padx=5)
 
-apply_button = tk.Button(root, text="Aplicar Rango de Color", command=update_color_range)
-apply_button.pack(pady=10)
 
-root.protocol("WM_DELETE_WINDOW", close_app)
-root.mainloop()
+    frame_color_range = tk.Frame(root)
+    frame_color_range.pack(pady=10)
+
+    tk.Label(frame_color_range, text="Hue Lower").grid(row=0, column=0)
+    hue_low_entry = tk.Entry(frame_color_range, width=5)
+    hue_low_entry.insert(0, greenLower[0])
+    hue_low_entry.grid(row=0, column=1)
+
+    tk.Label(frame_color_range, text="Hue Upper").grid(row=0, column=2)
+    hue_high_entry = tk.Entry(frame_color_range, width=5)
+    hue_high_entry.insert(0, greenUpper[0])
+    hue_high_entry.grid(row=0, column=3)
+
+    tk.Label(frame_color_range, text="Saturation Lower").grid(row=1, column=0)
+    sat_low_entry = tk.Entry(frame_color_range, width=5)
+    sat_low_entry.insert(0, greenLower[1])
+    sat_low_entry.grid(row=1, column=1)
+
+    tk.Label(frame_color_range, text="Saturation Upper").grid(row=1, column=2)
+    sat_high_entry = tk.Entry(frame_color_range, width=5)
+    sat_high_entry.insert(0, greenUpper[1])
+    sat_high_entry.grid(row=1, column=3)
+
+    tk.Label(frame_color_range, text="Value Lower").grid(row=2, column=0)
+    val_low_entry = tk.Entry(frame_color_range, width=5)
+    val_low_entry.insert(0, greenLower[2])
+    val_low_entry.grid(row=2, column=1)
+
+    tk.Label(frame_color_range, text="Value Upper").grid(row=2, column=2)
+    val_high_entry = tk.Entry(frame_color_range, width=5)
+    val_high_entry.insert(0, greenUpper[2])
+    val_high_entry.grid(row=2, column=3)
+
+    frame_calibration = tk.Frame(root)
+    frame_calibration.pack(pady=10)
+
+    apply_button = tk.Button(frame_calibration, text="Aplicar Rango de Color", command=update_color_range)
+    apply_button.grid(row=0, column=0, padx=5)
+
+    calibrate_button = tk.Button(frame_calibration, text="Calibrar", command=lambda: with_vision(start_calibration))
+    calibrate_button.grid(row=0, column=1, padx=5)
+
+    adaptive_mode = tk.BooleanVar(value=False)
+    adaptive_check = tk.Checkbutton(frame_calibration, text="Ajuste automático", variable=adaptive_mode,
+                                    command=lambda: with_vision(toggle_adaptive_mode))
+    adaptive_check.grid(row=0, column=2, padx=5)
+
+    root.protocol("WM_DELETE_WINDOW", close_app)
+
+
+# Trazos en la pizarra; puntos, cortes y borrados van en una sola cola para no reordenarse (hilo de Tk)
+def on_canvas_event(event):
+    if isinstance(event, PenMoved):
+        stroke_model.add_point(event.position, event.color, event.pen)
+    elif isinstance(event, StrokeEnded):
+        stroke_model.break_stroke(event.pen)
+    else:
+        clear_canvas()
+
+# Después de cada tanda de eventos: pasar los trazos al canvas
+def after_drain():
+    stroke_model.flush()
+
+# Grabación de la sesión (hilo del bus, fuera de Tk)
+def record_event(event):
+    if isinstance(event, PenMoved):
+        recorder.point(event.position, event.color, event.pen, t=event.t)
+    elif isinstance(event, StrokeEnded):
+        recorder.break_stroke(event.pen, t=event.t)
+    elif isinstance(event, CanvasCleared):
+        recorder.clear(t=event.t)
+    else:
+        from session_recorder import MAZE_START, MAZE_WALL, MAZE_GOAL
+        kind = {MazeStarted: MAZE_START, MazeCollision: MAZE_WALL, MazeFinished: MAZE_GOAL}[type(event)]
+        code = MAZE_LEVELS.index(event.level) + 1 if event.level in MAZE_LEVELS else 0
+        recorder.maze_event(kind, event.position, code, event.moves, t=event.t)
+
+# Agregar al menú los modelos de movimiento (hilo de Tk, tras cargar la visión)
+def fill_motion_menu():
+    menu = motion_menu["menu"]
+    menu.delete(0, "end")
+    for name in MOTION_MODELS:
+        menu.add_command(label=name, command=tk._setit(motion_name, name, set_motion_model))
+
+# Agregar al menú los modos de búsqueda gruesa (hilo de Tk, tras cargar la visión)
+def fill_coarse_menu():
+    menu = coarse_menu["menu"]
+    menu.delete(0, "end")
+    for name in [FULL_RESOLUTION] + list(COARSE_PRESETS):
+        menu.add_command(label=name, command=tk._setit(coarse_name, name, set_coarse_mode))
+
+# Función para medir el arranque: la ventana ya se ve y el stack de visión no se cargó
+def check_startup(budget_ms):
+    root.update()
+    elapsed = (time.perf_counter() - _t_start) * 1000.0
+    vision_loaded = "cv2" in sys.modules
+    print("Arranque: %.0f ms (presupuesto %.0f ms), visión cargada: %s"
+          % (elapsed, budget_ms, "sí" if vision_loaded else "no"))
+    return 1 if elapsed > budget_ms or vision_loaded else 0
+
+def main(argv=None):
+    global cli_args, video_source, recorder, greenLower, greenUpper, bridge, hud_enabled
+    cli_args = get_arguments(argv)
+    video_source = cli_args.source
+    hud_enabled = cli_args.hud
+
+    # Rango guardado por la última calibración, si existe
+    profile = load_profile(cli_args.profile)
+    if profile is not None:
+        greenLower, greenUpper = profile
+
+    if cli_args.record:
+        # Grabación de la sesión en un archivo binario
+        from session_recorder import SessionRecorder
+        recorder = SessionRecorder(cli_args.record)
+
+    build_ui()
+
+    if cli_args.startup_check is not None:
+        status = check_startup(cli_args.startup_check)
+        root.destroy()
+        return status
+
+    # Los consumidores se suscriben al bus; los de la interfaz reciben en el hilo de Tk
+    bridge = TkBridge(root, bus.start(), after_drain=after_drain)
+    bridge.subscribe(on_canvas_event, PenMoved, StrokeEnded, CanvasCleared)
+    bridge.subscribe(lambda event: show_color_range(event.lower, event.upper), RangeChanged, coalesce=True)
+    bridge.subscribe(lambda event: on_vision_loaded(), VisionLoaded)
+    bridge.subscribe(lambda event: messagebox.showerror("Error", event.message), StreamFailed)
+    if recorder is not None:
+        bus.subscribe(record_event, PenMoved, StrokeEnded, CanvasCleared,
+                      MazeStarted, MazeCollision, MazeFinished, maxsize=4096)
+    root.mainloop()
+
+    # Esperar a que la grabación termine de recibir lo pendiente
+    bus.stop()
+    bridge.close()
+    if recorder is not None:
+        recorder.close()
+    if adaptive_range is not None:
+        # Conservar el rango ajustado para la próxima sesión
+        save_profile(greenLower, greenUpper, cli_args.profile, **adaptive_range.profile())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark sin cámara del pipeline de seguimiento
+
+Ejemplo: python3 benchmark.py --source synthetic --frames 500 --roi --min-fps 60
+         python3 benchmark.py --startup-budget 400
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+import tracemalloc
+from collections import OrderedDict
+import numpy as np
+
+import tracker
+from frame_sources import open_source, SyntheticSource
+from roi_tracker import RoiTracker
+from lut_segmenter import LutSegmenter
+from motion_model import MOTION_MODELS, MotionStage
+from trail_renderer import Trail, TrailLayer
+from profiler import PROFILER
+from frame_buffers import FrameBuffers
+from coarse_to_fine import CoarseToFine
+
+LOWER = (100, 150, 50)
+UPPER = (140, 255, 255)
+
+
+def get_arguments():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('-s', '--source', default='synthetic',
+                    help='"synthetic", a video file or a camera index')
+    ap.add_argument('-n', '--frames', type=int, default=300,
+                    help='Number of frames to process')
+    ap.add_argument('--roi', action='store_true',
+                    help='Use region-of-interest tracking')
+    ap.add_argument('--lut', action='store_true',
+                    help='Use lookup-table segmentation')
+    ap.add_argument('--motion', default='Sin filtro', choices=list(MOTION_MODELS),
+                    help='Motion model for the centroid')
+    ap.add_argument('--json', help='Write the report to this JSON file')
+    ap.add_argument('--min-fps', type=float, default=0.0,
+                    help='Exit with an error if the throughput is lower')
+    ap.add_argument('--pool', action='store_true',
+                    help='Reuse preallocated buffers (fused flip+resize remap, dst= everywhere)')
+    ap.add_argument('--coarse', type=int, metavar='WIDTH',
+                    help='Coarse-to-fine: find the pen on a frame this wide, then refine at full resolution')
+    ap.add_argument('--no-refine', action='store_true',
+                    help='With --coarse, skip the full-resolution refinement (fastest, least accurate)')
+    ap.add_argument('--width', type=int, default=tracker.FRAME_WIDTH,
+                    help='Width the frames are prepared at')
+    ap.add_argument('--allocs', action='store_true',
+                    help='Measure the memory allocated per frame with tracemalloc (slower)')
+    ap.add_argument('--stages', action='store_true',
+                    help='Also time the inner tracker stages (blur, threshold, morphology, contours)')
+    ap.add_argument('--startup-budget', type=float, metavar='MS',
+                    help='Only time VirtualPen.py until its window is shown; '
+                         'exit with an error above MS or if the vision stack loaded early')
+    return vars(ap.parse_args())
+
+
+def map_truth(point, source_width, width=tracker.FRAME_WIDTH):
+    """Lleva un punto de la fuente al cuadro espejado y redimensionado."""
+    scale = width / float(source_width)
+    x = source_width - 1 - point[0]
+    return ((x + 0.5) * scale - 0.5, (point[1] + 0.5) * scale - 0.5)
+
+
+def percentiles(samples):
+    ms = np.array(samples) * 1000.0
+    return OrderedDict([
+        ("p50", float(np.percentile(ms, 50))),
+        ("p95", float(np.percentile(ms, 95))),
+        ("p99", float(np.percentile(ms, 99))),
+        ("mean", float(ms.mean())),
+    ])
+
+
+def run(source, frames, roi=False, lut=False, motion=None, pool=False, allocs=False, warmup=10,
+        coarse=None, refine=True, width=tracker.FRAME_WIDTH):
+    """Procesa frames cuadros de la fuente y devuelve el reporte.
+
+    Con allocs, mide por cuadro el pico de memoria nueva reservada (sin contar
+    los primeros warmup cuadros, en los que se crean los buffers).
+    """
+    timings = OrderedDict((name, []) for name in
+                          ["capture", "prepare", "segment", "render", "total"])
+    errors = []
+    misses = 0
+
+    segmenter = None
+    if lut:
+        segmenter = LutSegmenter()
+        segmenter.set_range("pen", LOWER, UPPER)
+    roi_tracker = RoiTracker() if roi else None
+    motion_stage = MotionStage(motion() if motion else None)
+    trail = TrailLayer()
+    pts = Trail()
+    buffers = FrameBuffers(width) if pool else None
+    # Con buffers, cada etapa escribe en su buffer; si no, las funciones de tracker
+    ops = buffers if pool else tracker
+    prepare = buffers.prepare if pool else lambda raw: tracker.prepare_frame(raw, width)
+    coarse_to_fine = CoarseToFine(coarse, refine) if coarse else None
+    allocated = []
+    if allocs:
+        tracemalloc.start()
+
+    def segment(region):
+        if segmenter is not None:
+            return ops.segment_lut(region, segmenter, "pen")
+        return ops.segment(region, LOWER, UPPER)
+
+    def threshold(region):
+        if segmenter is not None:
+            return segmenter.mask(region, "pen")
+        return tracker.threshold(region, LOWER, UPPER)
+
+    def find(region):
+        if coarse_to_fine is not None:
+            return coarse_to_fine.locate(region, threshold, segment)
+        return ops.find_center(segment(region))
+
+    # En la escena sintética el filtro usa el reloj de la escena, no el de pared,
+    # y su predicción se compara con la verdad en el instante predicho
+    scene = isinstance(source, SyntheticSource)
+
+    processed = 0
+    started = time.perf_counter()
+    while processed < frames:
+        if allocs:
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+        t0 = time.perf_counter()
+        item = source.read(buffers.raw_buffer()) if pool else source.read()
+        if item is None:
+            break
+        raw, truth = item
+        t1 = time.perf_counter()
+        frame = prepare(raw)
+        t2 = time.perf_counter()
+        center = roi_tracker.locate(frame, find) if roi_tracker else find(frame)
+        t3 = time.perf_counter()
+        if scene:
+            t_capture = source.time(source.index - 1)
+            center = motion_stage.process(center, t_capture, t_capture + (t3 - t0))
+            truth = source.point(motion_stage.target)
+        else:
+            center = motion_stage.process(center, t0, t3)
+        pts.appendleft(center)
+        trail.render(frame, pts, (0, 0, 255))
+        t4 = time.perf_counter()
+        if allocs and processed >= warmup:
+            allocated.append(tracemalloc.get_traced_memory()[1] - base)
+
+        PROFILER.frame_done()
+        for name, elapsed in zip(timings, [t1 - t0, t2 - t1, t3 - t2, t4 - t3, t4 - t0]):
+            timings[name].append(elapsed)
+        if truth is not None:
+            if center is None:
+                misses += 1
+            else:
+                tx, ty = map_truth(truth, raw.shape[1], width)
+                errors.append(np.hypot(center[0] - tx, center[1] - ty))
+        processed += 1
+
+    elapsed = time.perf_counter() - started
+    if allocs:
+        tracemalloc.stop()
+    report = OrderedDict([
+        ("frames", processed),
+        ("fps", processed / elapsed if elapsed else 0.0),
+        ("stages_ms", OrderedDict((name, percentiles(samples))
+                                  for name, samples in timings.items() if samples)),
+    ])
+    if errors or misses:
+        report["accuracy_px"] = OrderedDict([
+            ("mean", float(np.mean(errors)) if errors else None),
+            ("p95", float(np.percentile(errors, 95)) if errors else None),
+            ("misses", misses),
+        ])
+    if roi_tracker is not None:
+        report["roi_ratio"] = roi_tracker.roi_ratio()
+    if PROFILER.enabled:
+        report["profiler_ms"] = PROFILER.report()
+    if allocated:
+        kb = np.array(allocated) / 1024.0
+        report["allocated_kb"] = OrderedDict([
+            ("p50", float(np.percentile(kb, 50))),
+            ("max", float(kb.max())),
+            ("frame_sized", int((kb >= frames_kb(raw, width)).sum())),
+        ])
+    return report
+
+
+def frames_kb(frame, width=tracker.FRAME_WIDTH):
+    """Tamaño en KB de una máscara del cuadro preparado, el menor buffer por cuadro."""
+    height = frame.shape[0] * width // frame.shape[1]
+    return height * width / 1024.0
+
+
+def startup_check(budget_ms):
+    """Arranca VirtualPen.py en otro proceso y mide hasta que muestra la ventana."""
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "VirtualPen.py")
+    started = time.perf_counter()
+    result = subprocess.run([sys.executable, script, "--startup-check", str(budget_ms)],
+                            stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
+    wall = (time.perf_counter() - started) * 1000.0
+    output = result.stdout.strip() or (result.stderr.strip().splitlines() or [""])[-1]
+    print(output)
+    print("Proceso completo: %.0f ms (presupuesto %.0f ms)" % (wall, budget_ms))
+    return result.returncode == 0 and wall <= budget_ms
+
+
+def print_report(report):
+    print("frames: {frames}  fps: {fps:.1f}".format(**report))
+    for name, stats in report["stages_ms"].items():
+        print("  {:<8} p50 {p50:6.2f} ms  p95 {p95:6.2f} ms  p99 {p99:6.2f} ms".format(name, **stats))
+    accuracy = report.get("accuracy_px")
+    if accuracy is not None and accuracy["mean"] is not None:
+        print("  error    mean {mean:.2f} px  p95 {p95:.2f} px  misses {misses}".format(**accuracy))
+    if "roi_ratio" in report:
+        print("  roi      {:.0%} of frames".format(report["roi_ratio"]))
+    if "allocated_kb" in report:
+        print("  alloc    p50 {p50:.1f} KB  max {max:.1f} KB  frames with a full-frame allocation: {frame_sized}"
+              .format(**report["allocated_kb"]))
+    for name, stats in report.get("profiler_ms", {}).items():
+        print("    {:<12} p50 {p50:6.2f} ms  p95 {p95:6.2f} ms".format(name, **stats))
+
+
+def main():
+    args = get_arguments()
+    if args['startup_budget'] is not None:
+        sys.exit(0 if startup_check(args['startup_budget']) else 1)
+
+    if args['stages']:
+        PROFILER.enable()
+    source = open_source(args['source'])
+    if isinstance(source, SyntheticSource):
+        source.frames = args['frames']
+
+    try:
+        report = run(source, args['frames'], roi=args['roi'], lut=args['lut'],
+                     motion=MOTION_MODELS[args['motion']], pool=args['pool'], allocs=args['allocs'],
+                     coarse=args['coarse'], refine=not args['no_refine'], width=args['width'])
+    finally:
+        source.release()
+
+    print_report(report)
+    if args['json']:
+        with open(args['json'], "w") as f:
+            json.dump(report, f, indent=2)
+
+    if report["fps"] < args['min_fps']:
+        print("FPS por debajo del mínimo (%.1f < %.1f)" % (report["fps"], args['min_fps']))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
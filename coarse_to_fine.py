@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Segmentación de grueso a fino: se busca el lápiz en un cuadro muy reducido y
+el centro se refina con momentos en una ventana a resolución completa
+"""
+
+from collections import OrderedDict
+import numpy as np
+import cv2
+
+from tracker import find_contours
+from profiler import PROFILER
+
+# Ancho del cuadro reducido para cada compromiso entre velocidad y precisión.
+# refine=False devuelve el centro del cuadro reducido, sin volver a la resolución completa.
+PRESETS = OrderedDict([
+    ("Precisa", dict(coarse_width=300, refine=True)),
+    ("Equilibrada", dict(coarse_width=150, refine=True)),
+    ("Rápida", dict(coarse_width=100, refine=True)),
+    ("Máxima velocidad", dict(coarse_width=100, refine=False)),
+])
+
+
+class CoarseToFine:
+    """Detecta el blob en un cuadro de unos coarse_width de ancho y refina su centro.
+
+    El costo de la etapa gruesa depende de coarse_width y no del ancho del
+    cuadro, así que una cámara de más resolución sólo encarece la ventana de
+    refinamiento, que es del tamaño del lápiz.
+    """
+
+    def __init__(self, coarse_width=150, refine=True, margin=8, min_area=2):
+        self.coarse_width = coarse_width
+        self.refine = refine
+        self.margin = margin  # Píxeles (a resolución completa) alrededor de la caja gruesa
+        self.min_area = min_area  # Área mínima del blob en el cuadro reducido
+        self.small = None
+        self.window = None  # Última ventana de refinamiento (x0, y0, x1, y1)
+        self.center = None  # Último centro con decimales
+
+    def factor(self, width):
+        """Factor entero de reducción para un cuadro de este ancho."""
+        return max(1, int(round(width / float(self.coarse_width))))
+
+    def _reduce(self, frame, factor):
+        height, width = frame.shape[:2]
+        size = (width // factor, height // factor)
+        if self.small is None or self.small.shape[1::-1] != size or self.small.shape[2:] != frame.shape[2:]:
+            self.small = np.empty(size[::-1] + frame.shape[2:], np.uint8)
+        # Con un factor entero INTER_AREA promedia bloques exactos (el camino rápido de
+        # OpenCV) y hace también de desenfoque; el borde que no completa un bloque se ignora
+        cv2.resize(frame[:size[1] * factor, :size[0] * factor], size, dst=self.small,
+                   interpolation=cv2.INTER_AREA)
+        return self.small
+
+    def locate(self, frame, threshold, segment):
+        """Centro del lápiz en frame, o None.
+
+        threshold(region) devuelve la máscara sin limpiar (se usa en el cuadro
+        reducido) y segment(region) la máscara completa con desenfoque y
+        morfología (se usa en la ventana de refinamiento).
+        """
+        self.window = self.center = None
+        scale = self.factor(frame.shape[1])
+        if scale == 1:
+            # El cuadro ya es chico: no hay nada que ganar reduciéndolo
+            return self._refine(frame, segment, (0, 0, frame.shape[1], frame.shape[0]), None)
+
+        with PROFILER.section("grueso"):
+            small = self._reduce(frame, scale)
+            mask = threshold(small)
+            cv2.morphologyEx(mask, cv2.MORPH_OPEN, None, dst=mask)
+            cnts = find_contours(mask, copy=False)
+            if len(cnts) == 0:
+                return None
+            c = max(cnts, key=cv2.contourArea)
+            M = cv2.moments(c)
+            if M["m00"] < self.min_area:
+                return None
+
+        # Centro del píxel reducido i en la resolución completa: (i + 0.5) * scale - 0.5
+        coarse = ((M["m10"] / M["m00"] + 0.5) * scale - 0.5, (M["m01"] / M["m00"] + 0.5) * scale - 0.5)
+        if not self.refine:
+            self.center = coarse
+            return int(round(coarse[0])), int(round(coarse[1]))
+
+        x, y, w, h = cv2.boundingRect(c)
+        pad = scale + self.margin
+        height, width = frame.shape[:2]
+        rect = (max(0, int(x * scale - pad)), max(0, int(y * scale - pad)),
+                min(width, int((x + w) * scale + pad) + 1), min(height, int((y + h) * scale + pad) + 1))
+        return self._refine(frame, segment, rect, coarse)
+
+    def _refine(self, frame, segment, rect, coarse):
+        """Momentos de la máscara en la ventana rect: centro con precisión sub-píxel."""
+        with PROFILER.section("refinar"):
+            x0, y0, x1, y1 = rect
+            self.window = rect
+            mask = segment(frame[y0:y1, x0:x1])
+            M = cv2.moments(mask, binaryImage=True)
+        if M["m00"] == 0:
+            center = coarse
+        else:
+            center = (x0 + M["m10"] / M["m00"], y0 + M["m01"] / M["m00"])
+        if center is None:
+            return None
+        self.center = center
+        return int(round(center[0])), int(round(center[1]))
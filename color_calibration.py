@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Calibración automática del rango HSV del marcador y ajuste en línea con la iluminación
+"""
+
+import cv2
+import numpy as np
+
+# Límites de OpenCV para H, S y V
+HSV_MAX = np.array([179, 255, 255])
+
+
+def guide_rect(shape, fraction=0.15):
+    """Recuadro centrado donde el usuario pone el marcador: (x0, y0, x1, y1)."""
+    height, width = shape[:2]
+    half = int(min(width, height) * fraction / 2)
+    cx, cy = width // 2, height // 2
+    return cx - half, cy - half, cx + half, cy + half
+
+
+def sample_pixels(frame, rect):
+    """Píxeles HSV (N, 3) del recuadro de un cuadro BGR."""
+    x0, y0, x1, y1 = rect
+    hsv = cv2.cvtColor(frame[y0:y1, x0:x1], cv2.COLOR_BGR2HSV)
+    return hsv.reshape(-1, 3)
+
+
+def _clip(lower, upper):
+    lower = np.clip(np.floor(lower), 0, HSV_MAX).astype(int)
+    upper = np.clip(np.ceil(upper), 0, HSV_MAX).astype(int)
+    return tuple(int(v) for v in lower), tuple(int(v) for v in upper)
+
+
+def fit_gaussian(samples, k=2.5):
+    """Rango media ± k desviaciones por canal.
+
+    El tono no se trata como circular: un marcador rojo que cruza 0/180
+    queda con un rango recortado, igual que con inRange.
+    """
+    samples = np.asarray(samples, dtype=np.float64)
+    mean, std = samples.mean(axis=0), samples.std(axis=0)
+    return _clip(mean - k * std, mean + k * std)
+
+
+def fit_histogram(samples, coverage=0.95, margin=(4, 25, 25)):
+    """Rango que cubre la fracción coverage de cada canal según su histograma, más un margen."""
+    samples = np.asarray(samples)
+    tail = (1.0 - coverage) / 2.0
+    lower, upper = [], []
+    for channel in range(3):
+        cumulative = np.cumsum(np.bincount(samples[:, channel], minlength=256)) / float(len(samples))
+        lower.append(np.searchsorted(cumulative, tail) - margin[channel])
+        upper.append(np.searchsorted(cumulative, 1.0 - tail) + margin[channel])
+    return _clip(np.array(lower), np.array(upper))
+
+
+FITS = {"gaussian": fit_gaussian, "histogram": fit_histogram}
+
+
+class GuidedCalibration:
+    """Junta muestras del recuadro guía durante algunos cuadros y ajusta el rango."""
+
+    def __init__(self, frames=30, method="histogram"):
+        self.frames = frames
+        self.method = method
+        self.samples = []
+        self.active = False
+
+    def start(self):
+        self.samples = []
+        self.active = True
+
+    def feed(self, frame):
+        """Agrega el recuadro de este cuadro; devuelve (lower, upper) al terminar, si no None."""
+        if not self.active:
+            return None
+        self.samples.append(sample_pixels(frame, guide_rect(frame.shape)))
+        if len(self.samples) < self.frames:
+            return None
+        self.active = False
+        samples = np.concatenate(self.samples)
+        self.samples = []
+        return FITS[self.method](samples)
+
+    def draw(self, frame):
+        """Dibuja el recuadro y el avance sobre el cuadro."""
+        x0, y0, x1, y1 = guide_rect(frame.shape)
+        cv2.rectangle(frame, (x0, y0), (x1, y1), (0, 255, 255), 2)
+        cv2.putText(frame, "Calibrando %d/%d" % (len(self.samples), self.frames), (x0, y0 - 8),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 255), 1)
+
+
+class AdaptiveRange:
+    """Sigue la deriva de la iluminación con un promedio móvil de los píxeles del marcador."""
+
+    def __init__(self, lower, upper, rate=0.1, k=2.5, radius=6, every=5,
+                 min_pixels=20, max_step=3, margin=(5, 30, 30)):
+        self.lower = np.array(lower, dtype=np.float64)
+        self.upper = np.array(upper, dtype=np.float64)
+        # Estimación inicial: media ± k desviaciones reproduce el rango recibido
+        self.mean = (self.lower + self.upper) / 2.0
+        self.var = ((self.upper - self.lower) / (2.0 * k)) ** 2
+        # El rango se desplaza con la media pero no queda más angosto que el calibrado
+        self.half_width = (self.upper - self.lower) / 2.0
+        self.rate = rate
+        self.k = k
+        self.radius = radius
+        self.every = every  # Cada cuántos cuadros se muestrea
+        self.min_pixels = min_pixels
+        self.max_step = max_step  # Máximo cambio de un límite por actualización
+        self.margin = np.array(margin)
+        self.frame_count = 0
+
+    def observe(self, frame, center):
+        """Muestrea alrededor del centro detectado; devuelve el nuevo (lower, upper) si cambió."""
+        self.frame_count += 1
+        if center is None or self.frame_count % self.every:
+            return None
+        x, y = int(center[0]), int(center[1])
+        r = self.radius
+        height, width = frame.shape[:2]
+        rect = (max(0, x - r), max(0, y - r), min(width, x + r + 1), min(height, y + r + 1))
+        if rect[2] <= rect[0] or rect[3] <= rect[1]:
+            return None
+        pixels = sample_pixels(frame, rect).astype(np.float64)
+
+        # Sólo píxeles cerca del rango actual, para no aprender el fondo
+        near = np.all((pixels >= self.lower - self.margin) & (pixels <= self.upper + self.margin), axis=1)
+        pixels = pixels[near]
+        if len(pixels) < self.min_pixels:
+            return None
+
+        self.mean += self.rate * (pixels.mean(axis=0) - self.mean)
+        self.var += self.rate * (pixels.var(axis=0) - self.var)
+        half = np.maximum(self.k * np.sqrt(self.var), self.half_width)
+        lower = np.clip(self.mean - half, self.lower - self.max_step, self.lower + self.max_step)
+        upper = np.clip(self.mean + half, self.upper - self.max_step, self.upper + self.max_step)
+        new = _clip(lower, upper)
+        if new == _clip(self.lower, self.upper):
+            return None
+        self.lower, self.upper = np.array(new[0], float), np.array(new[1], float)
+        return new
+
+    def profile(self):
+        return {"mean": self.mean.round(2).tolist(), "std": np.sqrt(self.var).round(2).tolist()}
@@ -1,15 +1,16 @@
-from scipy.spatial import distance as dist
 from collections import OrderedDict
 import numpy as np
 import cv2
 
 class ColorLabeler:
-    def __init__(self):
-        colors = OrderedDict({
-            "red": (255, 0, 0),
-            "green": (0, 255, 0),
-            "blue": (0, 0, 255),
-        })
+    def __init__(self, colors=None):
+        # Any palette of name -> RGB can be given; default to red, green and blue
+        if colors is None:
+            colors = OrderedDict({
+                "red": (255, 0, 0),
+                "green": (0, 255, 0),
+                "blue": (0, 0, 255),
+            })
 
         # Allocate memory for the L*A*B image, then initialize the color names list
         self.lab = np.zeros((len(colors), 1, 3), dtype="uint8")
@@ -37,7 +38,7 @@ class ColorLabeler:
         # loop over the known LAB color values
         for (i, row) in enumerate(self.lab):
             # compute the distance between the current LAB color value and the mean of the image
-            d = dist.euclidean(row[0], mean)
+            d = np.linalg.norm(row[0] - np.asarray(mean))
 
             # If the distance is smaller than the current distance,
             # then update the bookkeeping value
@@ -46,3 +47,32 @@ class ColorLabeler:
 
         # Return the name of the color with the smallest distance
         return self.colorNames[minDist[1]]
+
+    def label_many(self, frame, contours):
+        # Label every contour in one pass: draw all of them into a single
+        # label image (index + 1 per contour), then remove a 2 pixel border,
+        # the same amount that label() erodes from each mask
+        n = len(contours)
+        if n == 0:
+            return []
+        labels = np.zeros(frame.shape[:2], dtype="int32")
+        for (i, c) in enumerate(contours):
+            cv2.drawContours(labels, [c], -1, i + 1, -1)
+        for c in contours:
+            cv2.drawContours(labels, [c], -1, 0, 5)
+
+        # Masked means for all contours at once, over the labeled pixels only
+        flat = labels.ravel()
+        idx = np.flatnonzero(flat)
+        ids = flat[idx]
+        pixels = frame.reshape(-1, 3)[idx].astype("float")
+        counts = np.bincount(ids, minlength=n + 1)[1:].astype("float")
+        means = np.zeros((n, 3), dtype="float")
+        for ch in range(3):
+            sums = np.bincount(ids, weights=pixels[:, ch], minlength=n + 1)[1:]
+            means[:, ch] = np.divide(sums, counts, out=np.zeros(n), where=counts > 0)
+
+        # Nearest reference color for every contour as one broadcast distance
+        refs = self.lab[:, 0, :].astype("float")
+        d = np.linalg.norm(means[:, None, :] - refs[None, :, :], axis=2)
+        return [self.colorNames[i] for i in d.argmin(axis=1)]
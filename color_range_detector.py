@@ -1,7 +1,11 @@
 import cv2
 import argparse
-from operator import xor
+import math
 import pickle
+import numpy as np
+from lut_segmenter import LutSegmenter
+from frame_sources import open_source
+from hsv_profile import save_profile
 
 
 def callback(value):
@@ -26,12 +30,22 @@ def get_arguments():
                     help='Path to the image')
     ap.add_argument('-w', '--webcam', required=False,
                     help='Use webcam', action='store_true')
+    ap.add_argument('-v', '--video', required=False,
+                    help='Path to a recorded video, or "synthetic" for a generated scene')
     ap.add_argument('-p', '--preview', required=False,
                     help='Show a preview of the image after applying the mask',
                     action='store_true')
+    ap.add_argument('-l', '--lut', required=False,
+                    help='Threshold with a lookup table instead of cvtColor + inRange',
+                    action='store_true')
+    ap.add_argument('-b', '--bits', required=False, type=int, default=5,
+                    help='Bits per channel of the lookup table (1-8)')
+    ap.add_argument('-g', '--grid', required=False,
+                    help='Compare a grid of candidate ranges around the trackbars; press "a" to apply the best',
+                    action='store_true')
     args = vars(ap.parse_args())
 
-    if not xor(bool(args['image']), bool(args['webcam'])):
+    if [bool(args['image']), bool(args['webcam']), bool(args['video'])].count(True) != 1:
         ap.error("Please specify only one image source")
 
     if not args['filter'].upper() in ['RGB', 'HSV']:
@@ -51,52 +65,154 @@ def get_trackbar_values(range_filter):
     return values
 
 
+def set_trackbar_values(range_filter, values):
+    names = ["%s_%s" % (j, i) for i in ["MIN", "MAX"] for j in range_filter]
+    for name, v in zip(names, values):
+        cv2.setTrackbarPos(name, "Trackbars", int(v))
+
+
+def candidate_ranges(lower, upper, step=(5, 20, 20)):
+    """Grid of 27 ranges: each channel window shrunk, kept or widened by its step."""
+    offsets = np.array(np.meshgrid(*[(-1, 0, 1)] * 3, indexing='ij')).reshape(3, -1).T * step
+    lowers = np.clip(np.array(lower) - offsets, 0, 255)
+    uppers = np.clip(np.array(upper) + offsets, 0, 255)
+    return lowers, np.maximum(uppers, lowers)
+
+
+def evaluate_ranges(frame, lowers, uppers, width=160):
+    """Masks and quality metrics for many ranges at once.
+
+    All candidates are thresholded in one broadcast pass over a small copy of
+    the frame. Returns (masks, fraction, compactness): the foreground fraction
+    of each mask and 4*pi*area/perimeter^2 of its largest contour (1 for a disc).
+    """
+    height = int(frame.shape[0] * width / float(frame.shape[1]))
+    small = cv2.resize(frame, (width, height), interpolation=cv2.INTER_AREA)
+
+    masks = np.ones((len(lowers), height, width), dtype=bool)
+    for channel in range(3):
+        values = small[None, :, :, channel]
+        masks &= (values >= lowers[:, channel, None, None]) & (values <= uppers[:, channel, None, None])
+    fraction = masks.mean(axis=(1, 2))
+
+    compactness = np.zeros(len(lowers))
+    masks = masks.view(np.uint8) * 255
+    for k in np.flatnonzero(fraction):
+        contours = cv2.findContours(masks[k], cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)[-2]
+        c = max(contours, key=cv2.contourArea)
+        perimeter = cv2.arcLength(c, True)
+        if perimeter:
+            compactness[k] = 4 * math.pi * cv2.contourArea(c) / perimeter ** 2
+    return masks, fraction, compactness
+
+
+def best_candidate(fraction, compactness, min_fraction=0.0005, max_fraction=0.2):
+    """Index of the most compact mask with a plausible marker size, or None."""
+    score = np.where((fraction >= min_fraction) & (fraction <= max_fraction), compactness, -1)
+    k = int(score.argmax())
+    return k if score[k] >= 0 else None
+
+
+def candidates_montage(masks, fraction, compactness, best=None, columns=9):
+    """Tiles the candidate masks with their metrics; the best one is framed in green."""
+    tiles = []
+    for k, mask in enumerate(masks):
+        tile = cv2.cvtColor(mask, cv2.COLOR_GRAY2BGR)
+        cv2.putText(tile, "%d %.1f%% c%.2f" % (k, 100 * fraction[k], compactness[k]), (2, 12),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.35, (0, 0, 255), 1)
+        if k == best:
+            cv2.rectangle(tile, (0, 0), (tile.shape[1] - 1, tile.shape[0] - 1), (0, 255, 0), 2)
+        tiles.append(tile)
+    rows = [np.hstack(tiles[i:i + columns]) for i in range(0, len(tiles), columns)]
+    return np.vstack(rows)
+
+
 def main():
     args = get_arguments()
 
     range_filter = args['filter'].upper()
 
-    if args['image']:
-        image = cv2.imread(args['image'])
+    # The lookup table maps BGR straight to the mask, so frames are not converted
+    segmenter = None
+    if args['lut']:
+        segmenter = LutSegmenter(args['bits'], space='BGR' if range_filter == 'RGB' else 'HSV')
 
+    def convert(image):
+        # Converted once per frame; the grid always needs the filter's color space
         if range_filter == 'RGB':
-            frame_to_thresh = image.copy()
+            color = image
         else:
-            frame_to_thresh = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
-    else:
+            color = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
+        return (image if segmenter is not None else color), color
+
+    if args['image']:
+        image = cv2.imread(args['image'])
+        frame_to_thresh, frame_for_grid = convert(image)
+    elif args['webcam']:
         camera = cv2.VideoCapture(1)
         if camera.read()[0] == False:
             camera = cv2.VideoCapture(0)
+    else:
+        video = open_source(args['video'], loop=True)
 
     setup_trackbars(range_filter)
 
+    last_values = None
+    new_frame = True
+    best = None
     while True:
-        if args['webcam']:
-            ret, image = camera.read()
+        if not args['image']:
+            if args['webcam']:
+                ret, image = camera.read()
+            else:
+                item = video.read()
+                ret = item is not None
+                image = item[0] if ret else None
 
             if not ret:
                 break
 
-            if range_filter == 'RGB':
-                frame_to_thresh = image.copy()
-            else:
-                frame_to_thresh = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
-
-        v1_min, v2_min, v3_min, v1_max, v2_max, v3_max = get_trackbar_values(range_filter)
+            frame_to_thresh, frame_for_grid = convert(image)
+            new_frame = True
 
-        thresh = cv2.inRange(frame_to_thresh, (v1_min, v2_min, v3_min), (v1_max, v2_max, v3_max))
+        values = get_trackbar_values(range_filter)
+        v1_min, v2_min, v3_min, v1_max, v2_max, v3_max = values
 
-        if args['preview']:
-            preview = cv2.bitwise_and(image, image, mask=thresh)
-            cv2.imshow("Preview", preview)
-        else:
-            cv2.imshow("Original", image)
-            cv2.imshow("Thresh", thresh)
+        # A static image is only thresholded again when a trackbar moved
+        if new_frame or values != last_values:
+            if segmenter is not None:
+                # Only rebuilds the table when a trackbar actually moved
+                segmenter.set_range('range', (v1_min, v2_min, v3_min), (v1_max, v2_max, v3_max))
+                thresh = segmenter.mask(frame_to_thresh, 'range')
+            else:
+                thresh = cv2.inRange(frame_to_thresh, (v1_min, v2_min, v3_min), (v1_max, v2_max, v3_max))
 
-        if cv2.waitKey(1) & 0xFF is ord('q'):
+            if args['preview']:
+                preview = cv2.bitwise_and(image, image, mask=thresh)
+                cv2.imshow("Preview", preview)
+            else:
+                cv2.imshow("Original", image)
+                cv2.imshow("Thresh", thresh)
+
+            if args['grid']:
+                lowers, uppers = candidate_ranges(values[:3], values[3:])
+                masks, fraction, compactness = evaluate_ranges(frame_for_grid, lowers, uppers)
+                best = best_candidate(fraction, compactness)
+                cv2.imshow("Candidates", candidates_montage(masks, fraction, compactness, best))
+
+            last_values = values
+            new_frame = False
+
+        key = cv2.waitKey(1) & 0xFF
+        if key == ord('a') and best is not None:
+            set_trackbar_values(range_filter, tuple(lowers[best]) + tuple(uppers[best]))
+        if key == ord('q'):
             t =  (v1_min, v2_min, v3_min, v1_max, v2_max, v3_max)
             with open("range.pickle", "wb") as f:
                 pickle.dump(t,f)
+            if range_filter == 'HSV':
+                # The tracker loads this profile at startup
+                save_profile(t[:3], t[3:])
             break
 
 
@@ -0,0 +1,385 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Bus de eventos tipados entre el seguimiento, la pizarra, el laberinto y la grabación
+
+Los productores publican desde cualquier hilo; un bucle asyncio en su propio
+hilo reparte cada evento a las colas de los suscriptores. Los consumidores
+asíncronos (p. ej. la grabación) corren en ese bucle y los de la interfaz
+reciben los eventos en el hilo de Tk a través de TkBridge.
+"""
+
+import os
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+
+# asyncio tarda en importarse; se carga en EventBus.start, después de mostrar la ventana
+asyncio = None
+
+
+@dataclass(frozen=True)
+class Event:
+    """Base de los eventos del bus."""
+
+    def coalesce_key(self):
+        """Clave de los eventos que se pueden reemplazar por el más nuevo, o None."""
+        return None
+
+
+@dataclass(frozen=True)
+class PenMoved(Event):
+    position: tuple
+    color: str = "#000000"  # Color del trazo en hexadecimal, como en el canvas
+    pen: int = 0
+    t: float = field(default_factory=time.time)
+
+    def coalesce_key(self):
+        return (PenMoved, self.pen)
+
+
+@dataclass(frozen=True)
+class StrokeEnded(Event):
+    pen: int = 0
+    t: float = field(default_factory=time.time)
+
+
+@dataclass(frozen=True)
+class CanvasCleared(Event):
+    t: float = field(default_factory=time.time)
+
+
+@dataclass(frozen=True)
+class RangeChanged(Event):
+    lower: tuple
+    upper: tuple
+
+    def coalesce_key(self):
+        return RangeChanged
+
+
+@dataclass(frozen=True)
+class MazeStarted(Event):
+    level: str
+    position: tuple
+    moves: int = 0
+    t: float = field(default_factory=time.time)
+
+
+@dataclass(frozen=True)
+class MazeCollision(Event):
+    level: str
+    position: tuple
+    moves: int = 0
+    t: float = field(default_factory=time.time)
+
+
+@dataclass(frozen=True)
+class MazeFinished(Event):
+    level: str
+    position: tuple
+    moves: int = 0
+    t: float = field(default_factory=time.time)
+
+
+@dataclass(frozen=True)
+class VisionLoaded(Event):
+    pass
+
+
+@dataclass(frozen=True)
+class StreamFailed(Event):
+    message: str
+
+
+class Mailbox:
+    """Cola acotada de un suscriptor.
+
+    Con coalesce, un evento con coalesce_key reemplaza al pendiente con la
+    misma clave en vez de encolarse detrás; un evento sin clave hace de
+    límite, así nunca se reordena algo respecto de él. Si la cola está
+    llena, el evento nuevo se descarta y se cuenta en dropped.
+    """
+
+    def __init__(self, maxsize=512, coalesce=False, on_ready=None):
+        self.items = deque()
+        self.maxsize = maxsize
+        self.coalesce = coalesce
+        self.on_ready = on_ready  # Se llama cuando la cola deja de estar vacía
+        self.on_space = None  # Se llama cuando una cola llena vuelve a tener lugar
+        self.lock = threading.Lock()
+        self.slots = {}  # Clave -> posición absoluta del evento reemplazable pendiente
+        self.popped = 0  # Eventos sacados desde el principio, para traducir las posiciones
+        self.dropped = 0
+        self.coalesced = 0
+
+    def put(self, event):
+        """Encola event; devuelve False si se descartó por falta de lugar."""
+        key = event.coalesce_key() if self.coalesce else None
+        with self.lock:
+            if key is not None:
+                position = self.slots.get(key)
+                if position is not None:
+                    self.items[position - self.popped] = event
+                    self.coalesced += 1
+                    return True
+            if len(self.items) >= self.maxsize:
+                self.dropped += 1
+                return False
+            was_empty = not self.items
+            if key is None:
+                self.slots.clear()
+            else:
+                self.slots[key] = self.popped + len(self.items)
+            self.items.append(event)
+        if was_empty and self.on_ready is not None:
+            self.on_ready()
+        return True
+
+    def get(self):
+        """Saca el evento más antiguo, o None si no hay."""
+        with self.lock:
+            if not self.items:
+                return None
+            was_full = len(self.items) >= self.maxsize
+            event = self.items.popleft()
+            self.popped += 1
+            if self.slots:
+                key = event.coalesce_key()
+                if self.slots.get(key) == self.popped - 1:
+                    del self.slots[key]
+        if was_full and self.on_space is not None:
+            self.on_space()
+        return event
+
+    def full(self):
+        return len(self.items) >= self.maxsize
+
+    def __len__(self):
+        return len(self.items)
+
+
+class EventBus:
+    """Reparte eventos a los suscriptores desde un bucle asyncio en su propio hilo.
+
+    publish() no bloquea nunca y se puede llamar desde cualquier hilo; cada
+    suscriptor tiene su Mailbox, así que uno lento no frena a los demás.
+    send() y send_wait() esperan a que haya lugar: contrapresión para los
+    productores que prefieren ir más lento antes que perder eventos.
+    """
+
+    def __init__(self):
+        self.loop = None
+        self.early = []  # Publicado antes de start; se entrega al arrancar
+        self.routes = ()  # (tipos, mailbox); la tupla se reemplaza entera, nunca se modifica
+        self.consumers = []  # Mailboxes de los consumidores que corren en el bucle
+        self.tasks = []
+        self.thread = None
+        self.space = None
+
+    def start(self):
+        global asyncio
+        import asyncio
+        self.loop = asyncio.new_event_loop()
+        for event in self.early:
+            self.loop.call_soon(self._deliver, event)
+        self.early = []
+        self.thread = threading.Thread(target=self._run, name="event-bus", daemon=True)
+        self.thread.start()
+        return self
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def stop(self, timeout=1.0):
+        """Deja que los consumidores asíncronos vacíen sus colas y detiene el bucle."""
+        if self.thread is None:
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(self._shutdown(), self.loop).result(timeout)
+        except Exception:
+            pass
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(timeout)
+        self.thread = None
+
+    async def _shutdown(self):
+        while any(len(mailbox) for mailbox in self.consumers):
+            await asyncio.sleep(0.001)
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+
+    def attach(self, mailbox, types):
+        """Agrega una cola que recibe los eventos de los tipos dados."""
+        mailbox.on_space = self._space_freed
+        self.routes = self.routes + ((tuple(types), mailbox),)
+
+    def detach(self, mailbox):
+        self.routes = tuple(route for route in self.routes if route[1] is not mailbox)
+
+    def subscribe(self, handler, *types, coalesce=False, maxsize=512):
+        """handler(event) corre en el bucle del bus, en orden; puede ser una corrutina."""
+        if self.loop is None:
+            raise RuntimeError("subscribe necesita el bus iniciado (start)")
+        mailbox = Mailbox(maxsize, coalesce)
+
+        async def consume(wake):
+            while True:
+                await wake.wait()
+                wake.clear()
+                event = mailbox.get()
+                while event is not None:
+                    try:
+                        result = handler(event)
+                        if asyncio.iscoroutine(result):
+                            await result
+                    except Exception:
+                        # Un consumidor con error no debe dejar de recibir los eventos siguientes
+                        import traceback
+                        traceback.print_exc()
+                    event = mailbox.get()
+
+        def start():
+            # Dentro del bucle: el aviso de la cola despierta a la tarea consumidora
+            wake = asyncio.Event()
+            mailbox.on_ready = wake.set
+            self.tasks.append(self.loop.create_task(consume(wake)))
+            self.attach(mailbox, types)
+
+        self.consumers.append(mailbox)
+        self.loop.call_soon_threadsafe(start)
+        return mailbox
+
+    def publish(self, event):
+        """Entrega event sin bloquear; se puede llamar desde cualquier hilo."""
+        if self.loop is None:
+            self.early.append(event)
+            return
+        self.loop.call_soon_threadsafe(self._deliver, event)
+
+    def _deliver(self, event):
+        for types, mailbox in self.routes:
+            if isinstance(event, types):
+                mailbox.put(event)
+
+    def _full(self, event):
+        return any(isinstance(event, types) and mailbox.full() for types, mailbox in self.routes)
+
+    def _space_freed(self):
+        if self.space is not None:
+            self.loop.call_soon_threadsafe(self.space.set)
+
+    async def send(self, event):
+        """Como publish, pero espera a que todas las colas interesadas tengan lugar."""
+        if self.space is None:
+            self.space = asyncio.Event()
+        while self._full(event):
+            self.space.clear()
+            await self.space.wait()
+        self._deliver(event)
+
+    def send_wait(self, event, timeout=None):
+        """send desde otro hilo: bloquea al productor mientras algún consumidor esté lleno."""
+        asyncio.run_coroutine_threadsafe(self.send(event), self.loop).result(timeout)
+
+
+class TkBridge:
+    """Entrega eventos del bus en el hilo de Tk.
+
+    El hilo del bus despierta a Tk escribiendo en un pipe registrado con
+    createfilehandler, así no hay que sondear; donde Tk no lo permite
+    (Windows) se vacía con root.after cada interval milisegundos.
+    """
+
+    def __init__(self, root, bus, batch=256, interval=16, after_drain=None):
+        import tkinter
+        self.root = root
+        self.bus = bus
+        self.batch = batch  # Máximo de eventos por suscriptor y vuelta, para no trabar la interfaz
+        self.interval = interval
+        self.after_drain = after_drain
+        self.subscriptions = []  # (mailbox, handler)
+        self.woken = False
+        self.wake_read = self.wake_write = None
+        try:
+            self._open_wake_pipe(tkinter)
+            self.polling = False
+        except (AttributeError, OSError, tkinter.TclError):
+            # Sin createfilehandler ni os.set_blocking (Windows antes de 3.12): sondear
+            self.polling = True
+            root.after(interval, self._poll)
+
+    def _open_wake_pipe(self, tkinter):
+        register = self.root.tk.createfilehandler
+        wake_read, wake_write = os.pipe()
+        try:
+            os.set_blocking(wake_read, False)
+            os.set_blocking(wake_write, False)
+            register(wake_read, tkinter.READABLE, self._on_wake)
+        except BaseException:
+            os.close(wake_read)
+            os.close(wake_write)
+            raise
+        self.wake_read, self.wake_write = wake_read, wake_write
+
+    def subscribe(self, handler, *types, coalesce=False, maxsize=512):
+        """handler(event) corre en el hilo de Tk."""
+        mailbox = Mailbox(maxsize, coalesce, on_ready=self._wake)
+        self.subscriptions.append((mailbox, handler))
+        self.bus.attach(mailbox, types)
+        return mailbox
+
+    def unsubscribe(self, mailbox):
+        self.bus.detach(mailbox)
+        self.subscriptions = [s for s in self.subscriptions if s[0] is not mailbox]
+
+    def _wake(self):
+        # Hilo del bus: un solo byte por tanda, aunque lleguen muchos eventos
+        if self.woken or self.polling:
+            return
+        self.woken = True
+        try:
+            os.write(self.wake_write, b"\0")
+        except BlockingIOError:
+            pass
+
+    def _on_wake(self, fd, mask):
+        try:
+            os.read(self.wake_read, 4096)
+        except BlockingIOError:
+            pass
+        self.drain()
+
+    def _poll(self):
+        self.drain()
+        self.root.after(self.interval, self._poll)
+
+    def drain(self):
+        """Pasa a cada handler lo que tenga pendiente (hilo de Tk)."""
+        # Bajar la marca antes de leer: un evento que llega durante la vuelta vuelve a despertar
+        self.woken = False
+        more = False
+        for mailbox, handler in list(self.subscriptions):
+            for _ in range(self.batch):
+                event = mailbox.get()
+                if event is None:
+                    break
+                handler(event)
+            else:
+                more = more or len(mailbox) > 0
+        if self.after_drain is not None:
+            self.after_drain()
+        if more:
+            # Quedaron eventos: seguir después de que Tk atienda la interfaz
+            self.root.after(1, self.drain)
+
+    def close(self):
+        if self.wake_read is None:
+            return
+        self.root.tk.deletefilehandler(self.wake_read)
+        os.close(self.wake_read)
+        os.close(self.wake_write)
+        self.wake_read = self.wake_write = None
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Buffers reutilizables para preparar y segmentar cuadros sin reservar memoria en cada uno
+"""
+
+import threading
+from collections import deque
+import numpy as np
+import cv2
+
+from tracker import FRAME_WIDTH, find_contours, contour_center
+from profiler import PROFILER
+
+
+class FrameBuffers:
+    """Juego de buffers preasignados; cada etapa escribe con dst= en el suyo.
+
+    slots es cuántos cuadros preparados pueden estar en uso a la vez: 1 en el
+    bucle en serie, más en el pipeline, donde viajan por las colas mientras
+    se prepara el siguiente. En el pipeline cada cuadro se toma de la lista
+    libre con acquire y vuelve con release cuando nadie lo usa más (al
+    dibujarse o al descartarlo una cola). prepare sin out sólo sirve en el
+    bucle en serie, donde se reescribe el mismo cuadro sin esperar.
+    """
+
+    def __init__(self, width=FRAME_WIDTH, slots=1):
+        self.width = width
+        self.slots = slots
+        self.source_shape = None
+        self.maps = None
+        self.prepared = []  # Cuadros preparados propios (slots)
+        self.slot = 0
+        self.raw = None  # Cuadro crudo para las fuentes que aceptan out=
+        self.scratch = {}  # Nombre -> buffer del tamaño más grande pedido
+        self.free = deque()  # Cuadros preparados que nadie está usando (acquire/release)
+        self.cond = threading.Condition()
+
+    def _build_maps(self, shape):
+        """Mapa de remap que espeja y redimensiona en una sola pasada."""
+        height, width = shape[:2]
+        out_height = self.prepared_shape(shape)[0]
+        scale_x, scale_y = width / float(self.width), height / float(out_height)
+        xs = (width - 1) - ((np.arange(self.width) + 0.5) * scale_x - 0.5)
+        ys = (np.arange(out_height) + 0.5) * scale_y - 0.5
+        map_x, map_y = np.meshgrid(xs.astype(np.float32), ys.astype(np.float32))
+        # Mapas en punto fijo: remap los recorre más rápido que en float
+        self.maps = cv2.convertMaps(map_x, map_y, cv2.CV_16SC2)
+        prepared = [np.empty((out_height, self.width) + tuple(shape[2:]), np.uint8)
+                    for _ in range(self.slots)]
+        with self.cond:
+            # Los cuadros de la forma anterior que sigan en uso no vuelven a la lista
+            self.prepared = prepared
+            self.free = deque(prepared)
+            self.cond.notify_all()
+        self.raw = np.empty(shape, np.uint8)
+        self.source_shape = shape
+
+    def raw_buffer(self):
+        """Destino para la próxima lectura de la fuente, o None antes del primer cuadro."""
+        return self.raw
+
+    def prepared_shape(self, shape):
+        """Forma del cuadro preparado para un cuadro crudo de la forma dada."""
+        height, width = shape[:2]
+        return (int(height * self.width / float(width)), self.width) + tuple(shape[2:])
+
+    def acquire(self, shape, timeout=None):
+        """Toma un cuadro preparado libre para un cuadro crudo de esta forma.
+
+        Espera hasta timeout segundos a que se libere uno; devuelve None si
+        todos siguen en uso (quien llama descarta el cuadro crudo).
+        """
+        if shape != self.source_shape:
+            self._build_maps(shape)
+        with self.cond:
+            if not self.free:
+                self.cond.wait(timeout)
+            return self.free.popleft() if self.free else None
+
+    def release(self, buffer):
+        """Devuelve un cuadro tomado con acquire; se puede llamar desde cualquier hilo."""
+        with self.cond:
+            if any(buffer is own for own in self.prepared):
+                self.free.append(buffer)
+                self.cond.notify()
+
+    def prepare(self, frame, out=None):
+        """Como tracker.prepare_frame, pero con flip y resize fusionados en un remap.
+
+        out: destino tomado con acquire, o propio (p. ej. un slot de memoria
+        compartida); sin out se usan los cuadros propios por turno (bucle en serie).
+        """
+        with PROFILER.section("preparar"):
+            if frame.shape != self.source_shape:
+                self._build_maps(frame.shape)
+            if out is None:
+                out = self.prepared[self.slot]
+                self.slot = (self.slot + 1) % self.slots
+            cv2.remap(frame, self.maps[0], self.maps[1], cv2.INTER_LINEAR, dst=out,
+                      borderMode=cv2.BORDER_REPLICATE)
+            return out
+
+    def _scratch(self, name, shape):
+        """Vista del buffer name con la forma pedida; sólo crece, nunca se achica."""
+        buffer = self.scratch.get(name)
+        if buffer is None or buffer.shape[0] < shape[0] or buffer.shape[1] < shape[1]:
+            largest = shape if buffer is None else tuple(max(a, b) for a, b in zip(shape, buffer.shape))
+            buffer = self.scratch[name] = np.empty(largest, np.uint8)
+        return buffer[:shape[0], :shape[1]]
+
+    def segment(self, frame, lower, upper):
+        """Como tracker.segment; la máscara devuelta se reutiliza en la próxima llamada."""
+        height, width = frame.shape[:2]
+        blurred = self._scratch("blurred", (height, width, 3))
+        hsv = self._scratch("hsv", (height, width, 3))
+        mask = self._scratch("mask", (height, width))
+        eroded = self._scratch("eroded", (height, width))
+
+        with PROFILER.section("desenfoque"):
+            cv2.GaussianBlur(frame, (11, 11), 0, dst=blurred)
+        with PROFILER.section("umbral"):
+            cv2.cvtColor(blurred, cv2.COLOR_BGR2HSV, dst=hsv)
+            cv2.inRange(hsv, lower, upper, dst=mask)
+        with PROFILER.section("morfologia"):
+            cv2.erode(mask, None, dst=eroded, iterations=2)
+            cv2.dilate(eroded, None, dst=mask, iterations=2)
+        return mask
+
+    def segment_lut(self, frame, segmenter, name):
+        """Como tracker.segment_lut; la consulta de la tabla todavía reserva su resultado."""
+        height, width = frame.shape[:2]
+        blurred = self._scratch("blurred", (height, width, 3))
+        mask = self._scratch("mask", (height, width))
+        eroded = self._scratch("eroded", (height, width))
+
+        with PROFILER.section("desenfoque"):
+            cv2.GaussianBlur(frame, (11, 11), 0, dst=blurred)
+        with PROFILER.section("umbral"):
+            labels = segmenter.mask(blurred, name)
+        with PROFILER.section("morfologia"):
+            cv2.erode(labels, None, dst=eroded, iterations=2)
+            cv2.dilate(eroded, None, dst=mask, iterations=2)
+        return mask
+
+    def find_center(self, mask):
+        """Como tracker.find_center, copiando la máscara a un buffer propio."""
+        work = self._scratch("contours", mask.shape[:2])
+        np.copyto(work, mask)
+        cnts = find_contours(work, copy=False)
+        if len(cnts) == 0:
+            return None
+        return contour_center(max(cnts, key=cv2.contourArea))
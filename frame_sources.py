@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Fuentes de cuadros: cámara, archivo de video o escena sintética
+
+Todas devuelven (cuadro, verdad) con read(), o None cuando no hay cuadro.
+La verdad es el centro real del marcador (sólo en la escena sintética).
+"""
+
+import numpy as np
+import cv2
+
+
+class CameraSource:
+    """Cámara en vivo."""
+
+    def __init__(self, src=0):
+        self.capture = cv2.VideoCapture(src)
+
+    def read(self, out=None):
+        """out: buffer opcional donde escribir el cuadro, para no reservar uno nuevo."""
+        ok, frame = self.capture.read(out)
+        return (frame, None) if ok else None
+
+    def release(self):
+        self.capture.release()
+
+
+class VideoFileSource:
+    """Video grabado; opcionalmente vuelve a empezar al terminar."""
+
+    def __init__(self, path, loop=False):
+        self.path = path
+        self.loop = loop
+        self.capture = cv2.VideoCapture(path)
+        if not self.capture.isOpened():
+            raise IOError("No se pudo abrir el video: %s" % path)
+
+    def read(self, out=None):
+        ok, frame = self.capture.read(out)
+        if not ok and self.loop:
+            self.capture.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ok, frame = self.capture.read(out)
+        return (frame, None) if ok else None
+
+    def release(self):
+        self.capture.release()
+
+
+class SyntheticSource:
+    """Disco de color que se mueve sobre ruido, con su centro como verdad."""
+
+    def __init__(self, width=640, height=480, radius=15, color=(255, 0, 0),
+                 noise=40, frames=None, seed=0, fps=30.0):
+        self.width = width
+        self.height = height
+        self.radius = radius
+        self.color = color  # BGR; el azul puro cae dentro del rango HSV inicial
+        self.frames = frames  # None para una escena sin fin
+        self.fps = fps  # Reloj de la escena: el cuadro index ocurre en index / fps segundos
+        self.index = 0
+
+        # Fondos de ruido gris precalculados para que generar no domine la medición
+        rng = np.random.RandomState(seed)
+        base = rng.randint(100, 156, size=(height, width, 1)).astype(np.int16)
+        self.backgrounds = []
+        for _ in range(8):
+            grain = rng.randint(-noise, noise + 1, size=(height, width, 1))
+            self.backgrounds.append(np.clip(base + grain, 0, 255).repeat(3, axis=2).astype(np.uint8))
+
+    def point(self, t):
+        """Centro exacto del disco en el instante t de la escena (una curva de Lissajous)."""
+        margin = 2 * self.radius
+        x = margin + (self.width - 2 * margin) * (0.5 + 0.5 * np.sin(1.3 * t))
+        y = margin + (self.height - 2 * margin) * (0.5 + 0.5 * np.sin(2.1 * t + 0.7))
+        return (x, y)
+
+    def time(self, index):
+        """Instante de la escena en que ocurre el cuadro index."""
+        return index / self.fps
+
+    def position(self, index):
+        """Centro del disco, en píxeles enteros, en el cuadro index."""
+        x, y = self.point(self.time(index))
+        return (int(round(x)), int(round(y)))
+
+    def read(self, out=None):
+        if self.frames is not None and self.index >= self.frames:
+            return None
+        background = self.backgrounds[self.index % len(self.backgrounds)]
+        if out is None:
+            frame = background.copy()
+        else:
+            frame = out
+            np.copyto(frame, background)
+        center = self.position(self.index)
+        cv2.circle(frame, center, self.radius, self.color, -1)
+        self.index += 1
+        return frame, center
+
+    def release(self):
+        pass
+
+
+def open_source(spec, loop=False):
+    """Abre una fuente: un número de cámara, "synthetic" o la ruta de un video."""
+    spec = str(spec)
+    if spec.isdigit():
+        return CameraSource(int(spec))
+    if spec == "synthetic":
+        return SyntheticSource()
+    return VideoFileSource(spec, loop=loop)
@@ -0,0 +1,31 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Perfil del rango HSV guardado entre sesiones (sin dependencias de visión)
+"""
+
+import json
+import os
+import time
+
+PROFILE_PATH = "hsv_profile.json"
+
+
+def save_profile(lower, upper, path=PROFILE_PATH, **extra):
+    """Guarda el rango como JSON pequeño; se lee en microsegundos al arrancar."""
+    profile = {"lower": list(lower), "upper": list(upper), "saved": time.time()}
+    profile.update(extra)
+    with open(path, "w") as f:
+        json.dump(profile, f)
+
+
+def load_profile(path=PROFILE_PATH):
+    """Devuelve (lower, upper) del perfil guardado, o None si no hay uno válido."""
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path) as f:
+            profile = json.load(f)
+        return tuple(profile["lower"]), tuple(profile["upper"])
+    except (ValueError, KeyError, TypeError):
+        return None
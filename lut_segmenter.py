@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Segmentación por tabla de consulta: de BGR directo a máscara, sin cvtColor ni inRange
+"""
+
+from collections import OrderedDict
+import numpy as np
+import cv2
+
+# Cada clase de color ocupa un bit de la tabla
+MAX_CLASSES = 8
+
+
+class LutSegmenter:
+    """Tabla 3D de BGR cuantizado a bits de clase, reconstruida por clase al cambiar un rango."""
+
+    def __init__(self, bits=5, space="HSV"):
+        if not 1 <= bits <= 8:
+            raise ValueError("bits debe estar entre 1 y 8")
+        self.bits = bits
+        shift = 8 - bits
+        levels = 1 << bits
+
+        # Color representativo de cada celda de la tabla, en el espacio de los rangos
+        centers = (np.arange(levels) << shift) + ((1 << shift) >> 1)
+        b, g, r = np.meshgrid(centers, centers, centers, indexing="ij")
+        grid = np.stack([b, g, r], axis=-1).astype(np.uint8).reshape(-1, 1, 3)
+        if space.upper() == "HSV":
+            grid = cv2.cvtColor(grid, cv2.COLOR_BGR2HSV)
+        self.grid = grid.reshape(-1, 3)
+
+        # Aporte de cada canal al índice de la tabla: (b << 2*bits) | (g << bits) | r
+        dtype = np.uint16 if bits <= 5 else np.float32
+        q = np.arange(256) >> shift
+        self.channel_lut = np.dstack([q << (2 * bits), q << bits, q]).astype(dtype).reshape(1, 256, 3)
+        self.ones = np.ones((1, 3), dtype=np.float32)
+
+        self.table = np.zeros(levels ** 3, dtype=np.uint8)
+        self.classes = OrderedDict()  # nombre -> (bit, inferior, superior)
+        self.scratch = np.empty(0, dtype=np.uint8)  # Máscara de mask_from; sólo crece
+
+    def set_range(self, name, lower, upper):
+        """Define o cambia el rango de una clase; sólo se recalcula su bit."""
+        lower, upper = tuple(int(v) for v in lower), tuple(int(v) for v in upper)
+        if name in self.classes:
+            bit, old_lower, old_upper = self.classes[name]
+            if (old_lower, old_upper) == (lower, upper):
+                return
+        else:
+            used = {entry[0] for entry in self.classes.values()}
+            free = [1 << i for i in range(MAX_CLASSES) if 1 << i not in used]
+            if not free:
+                raise ValueError("la tabla admite como máximo %d clases" % MAX_CLASSES)
+            bit = free[0]
+
+        # El hilo de video consulta la tabla mientras tanto: se arma una copia
+        # y se cambia la referencia en una sola asignación
+        inside = np.all((self.grid >= lower) & (self.grid <= upper), axis=1)
+        table = self.table & np.uint8(~bit & 0xFF)
+        table[inside] |= np.uint8(bit)
+        classes = OrderedDict(self.classes)
+        classes[name] = (bit, lower, upper)
+        self.table, self.classes = table, classes
+
+    def remove_range(self, name):
+        classes = OrderedDict(self.classes)
+        bit = classes.pop(name)[0]
+        self.table, self.classes = self.table & np.uint8(~bit & 0xFF), classes
+
+    def classify(self, frame):
+        """Devuelve, por píxel, los bits de todas las clases en una sola consulta."""
+        idx = cv2.transform(cv2.LUT(frame, self.channel_lut), self.ones)
+        if idx.dtype != np.uint16:
+            idx = idx.astype(np.intp)
+        return self.table.take(idx)
+
+    def mask_from(self, labels, name, out=None):
+        """Máscara 0/255 de una clase a partir del resultado de classify (None: cualquier clase).
+
+        Sin out, la máscara se escribe en un buffer propio que se reutiliza en
+        la próxima llamada.
+        """
+        bit = 0xFF if name is None else self.classes[name][0]
+        if out is None:
+            size = labels.shape[0] * labels.shape[1]
+            if self.scratch.size < size:
+                self.scratch = np.empty(size, dtype=np.uint8)
+            out = self.scratch[:size].reshape(labels.shape[:2])
+        np.bitwise_and(labels, bit, out=out)
+        cv2.compare(out, 0, cv2.CMP_NE, dst=out)
+        return out
+
+    def mask(self, frame, name):
+        return self.mask_from(self.classify(frame), name)
+
+    def masks(self, frame):
+        """Máscaras de todas las clases a partir de una sola consulta (cada una en su arreglo)."""
+        labels = self.classify(frame)
+        return OrderedDict((name, self.mask_from(labels, name, np.empty(labels.shape[:2], np.uint8)))
+                           for name in self.classes)
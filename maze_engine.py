@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Motor del laberinto sin Tk: movimiento, colisiones, meta y simulación por lotes
+"""
+
+import numpy as np
+
+from maze_grid import segment_hits_wall
+import maze_generator
+
+# Resultados de un paso
+MOVE, WALL, GOAL, BLOCKED, FINISHED = "move", "wall", "goal", "blocked", "finished"
+
+
+class MazeEngine:
+    """Estado y reglas de un laberinto; las ventanas de Tk sólo lo dibujan."""
+
+    def __init__(self, grid, cell_size, start, goal, distance=None):
+        self.grid = np.asarray(grid, dtype=bool)  # grid[fila, columna], True = pared
+        self.cell_size = cell_size
+        self.start = tuple(start)  # (fila, columna)
+        self.goal = tuple(goal)
+        self._distance = distance  # Se puede reutilizar el del generador
+        self.reset()
+
+    @classmethod
+    def from_walls(cls, walls, size, cell_size, start, goal):
+        """Crea el motor desde una lista de paredes (x, y) y celdas (x, y), como VirtualPen."""
+        grid = np.zeros((size, size), dtype=bool)
+        if walls:
+            cells = np.array(walls)
+            grid[cells[:, 1], cells[:, 0]] = True
+        return cls(grid, cell_size, start[::-1], goal[::-1])
+
+    @property
+    def shape(self):
+        return self.grid.shape
+
+    @property
+    def distance(self):
+        """Campo de distancias a la meta (se calcula una sola vez)."""
+        if self._distance is None:
+            self._distance = maze_generator.distance_field(self.grid, self.goal)
+        return self._distance
+
+    def reset(self):
+        self.cell = self.start
+        self.last_point = None
+        self.moves = 0
+        self.finished = False
+
+    def is_open(self, cell):
+        r, c = cell
+        return 0 <= r < self.grid.shape[0] and 0 <= c < self.grid.shape[1] and not self.grid[r, c]
+
+    def move_cell(self, cell):
+        """Movimiento discreto a una celda vecina (teclado)."""
+        if self.finished:
+            return FINISHED
+        if not self.is_open(cell):
+            return BLOCKED
+        self.cell = tuple(cell)
+        self.moves += 1
+        if self.cell == self.goal:
+            self.finished = True
+            return GOAL
+        return MOVE
+
+    def step(self, position):
+        """Avanza el lápiz a position (x, y) en píxeles, revisando todo el trayecto."""
+        if self.finished:
+            return FINISHED
+        previous = self.last_point if self.last_point is not None else position
+        self.last_point = position
+
+        if segment_hits_wall(self.grid, self.cell_size, previous, position) is not None:
+            return WALL
+
+        self.cell = (int(position[1] // self.cell_size), int(position[0] // self.cell_size))
+        self.moves += 1
+        if self.cell == self.goal:
+            self.finished = True
+            return GOAL
+        return MOVE
+
+    def simulate(self, trajectory):
+        """Reproduce una trayectoria desde el inicio; devuelve (resultado, índice del punto)."""
+        self.reset()
+        for k, position in enumerate(trajectory):
+            event = self.step(position)
+            if event in (WALL, GOAL):
+                return event, k
+        return MOVE, len(trajectory) - 1
+
+    def simulate_batch(self, trajectories):
+        """Evalúa muchas trayectorias (N, T, 2) a la vez; NaN marca el relleno.
+
+        Cada segmento recorre exactamente las mismas celdas que step (el
+        recorrido de maze_grid.cells_on_segment, con todos los segmentos del
+        lote avanzando a la vez). Devuelve (resultados, índices) con lo mismo
+        que simulate daría para cada trayectoria sin su relleno.
+        """
+        traj = np.asarray(trajectories, dtype=float).reshape(len(trajectories), -1, 2)
+        n, t = traj.shape[:2]
+        rows, cols = self.grid.shape
+        valid = np.cumprod(np.isfinite(traj).all(axis=2), axis=1).astype(bool)
+        traj = np.where(valid[..., None], traj, 0.0)
+
+        # Segmento k: del punto k - 1 al punto k; el primero empieza donde termina
+        prev = np.concatenate([traj[:, :1], traj[:, :-1]], axis=1)
+        size = float(self.cell_size)
+        x0, y0 = prev[..., 0] / size, prev[..., 1] / size
+        x1, y1 = traj[..., 0] / size, traj[..., 1] / size
+        i, j = np.floor(x0), np.floor(y0)
+        dx, dy = x1 - x0, y1 - y0
+        n_steps = np.abs(np.floor(x1) - i) + np.abs(np.floor(y1) - j)
+
+        step_i = np.where(dx > 0, 1.0, -1.0)
+        step_j = np.where(dy > 0, 1.0, -1.0)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            t_max_x = np.where(dx != 0, ((i + (step_i > 0)) - x0) / dx, np.inf)
+            t_max_y = np.where(dy != 0, ((j + (step_j > 0)) - y0) / dy, np.inf)
+            t_delta_x = np.where(dx != 0, np.abs(1.0 / dx), np.inf)
+            t_delta_y = np.where(dy != 0, np.abs(1.0 / dy), np.inf)
+
+        def walls_at(i, j):
+            inside = (i >= 0) & (i < cols) & (j >= 0) & (j < rows)
+            r = np.where(inside, j, 0).astype(np.intp)
+            c = np.where(inside, i, 0).astype(np.intp)
+            return inside & self.grid[r, c]
+
+        hit = valid & walls_at(i, j)
+        longest = int(n_steps[valid].max()) if valid.any() else 0
+        for s in range(longest):
+            active = valid & ~hit & (n_steps > s)
+            if not active.any():
+                break
+            along_x = active & (t_max_x < t_max_y)
+            along_y = active & ~(t_max_x < t_max_y)
+            i = np.where(along_x, i + step_i, i)
+            t_max_x = np.where(along_x, t_max_x + t_delta_x, t_max_x)
+            j = np.where(along_y, j + step_j, j)
+            t_max_y = np.where(along_y, t_max_y + t_delta_y, t_max_y)
+            hit |= active & walls_at(i, j)
+
+        # Como step: la meta se mira en la celda del punto final, con división entera
+        goals = (valid & ~hit & (np.floor_divide(traj[..., 1], self.cell_size) == self.goal[0])
+                 & (np.floor_divide(traj[..., 0], self.cell_size) == self.goal[1]))
+        events = hit | goals
+        happened = events.any(axis=1)
+        first = events.argmax(axis=1)
+
+        outcome = np.full(n, MOVE, dtype=object)
+        outcome[happened & hit[np.arange(n), first]] = WALL
+        outcome[happened & goals[np.arange(n), first]] = GOAL
+        # Sin evento, simulate devuelve el último punto de la trayectoria
+        index = np.where(happened, first, valid.sum(axis=1) - 1).astype(int)
+        return outcome, index
+
+    def score(self):
+        """Puntaje de 0 a 100 del recorrido actual."""
+        return maze_generator.score_run(self.distance, self.start, self.moves)
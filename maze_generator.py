@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Generador procedural de laberintos con verificación de solución y dificultad por métricas
+"""
+
+import math
+import random
+from collections import deque
+import numpy as np
+
+# Parámetros de cada dificultad: tamaño, algoritmo, fracción de callejones que se abren
+# y rango buscado de la puntuación de dificultad (ver difficulty_score)
+DIFFICULTIES = {
+    "easy": {"size": (11, 11), "algorithm": "prim", "braid": 0.5, "target": (0, 45)},
+    "medium": {"size": (17, 17), "algorithm": "backtracker", "braid": 0.2, "target": (45, 140)},
+    "hard": {"size": (25, 25), "algorithm": "backtracker", "braid": 0.0, "target": (140, math.inf)},
+}
+
+NEIGHBOURS = ((-1, 0), (1, 0), (0, -1), (0, 1))
+
+
+def _rooms(rows, cols):
+    """Las celdas de paso están en coordenadas pares; entre ellas van las paredes."""
+    return (rows + 1) // 2, (cols + 1) // 2
+
+
+def generate_maze(rows, cols, seed=None, algorithm="backtracker"):
+    """Genera un laberinto perfecto como matriz (1 = pared, 0 = camino).
+
+    rows y cols deben ser impares para que la salida quede en (rows - 1, cols - 1).
+    """
+    rng = random.Random(seed)
+    grid = np.ones((rows, cols), dtype=np.uint8)
+    room_rows, room_cols = _rooms(rows, cols)
+
+    def carve(a, b):
+        grid[2 * a[0], 2 * a[1]] = 0
+        grid[a[0] + b[0], a[1] + b[1]] = 0
+        grid[2 * b[0], 2 * b[1]] = 0
+
+    def unvisited(cell, visited):
+        result = []
+        for dr, dc in NEIGHBOURS:
+            r, c = cell[0] + dr, cell[1] + dc
+            if 0 <= r < room_rows and 0 <= c < room_cols and not visited[r, c]:
+                result.append((r, c))
+        return result
+
+    visited = np.zeros((room_rows, room_cols), dtype=bool)
+    visited[0, 0] = True
+    grid[0, 0] = 0
+
+    if algorithm == "backtracker":
+        # Backtracking recursivo, con una pila explícita para grillas grandes
+        stack = [(0, 0)]
+        while stack:
+            cell = stack[-1]
+            options = unvisited(cell, visited)
+            if not options:
+                stack.pop()
+                continue
+            nxt = rng.choice(options)
+            visited[nxt] = True
+            carve(cell, nxt)
+            stack.append(nxt)
+    elif algorithm == "prim":
+        # Prim aleatorio: más ramificaciones y callejones cortos
+        frontier = [((0, 0), n) for n in unvisited((0, 0), visited)]
+        while frontier:
+            cell, nxt = frontier.pop(rng.randrange(len(frontier)))
+            if visited[nxt]:
+                continue
+            visited[nxt] = True
+            carve(cell, nxt)
+            frontier.extend((nxt, n) for n in unvisited(nxt, visited))
+    else:
+        raise ValueError("Algoritmo desconocido: %s" % algorithm)
+    return grid
+
+
+def braid(grid, fraction, seed=None):
+    """Abre una fracción de los callejones sin salida, creando ciclos (más fácil)."""
+    rng = random.Random(seed)
+    rows, cols = grid.shape
+    for r, c in dead_ends(grid):
+        if rng.random() >= fraction:
+            continue
+        walls = [(r + dr, c + dc) for dr, dc in NEIGHBOURS
+                 if 0 <= r + 2 * dr < rows and 0 <= c + 2 * dc < cols and grid[r + dr, c + dc]]
+        if walls:
+            grid[rng.choice(walls)] = 0
+    return grid
+
+
+def open_neighbours(grid):
+    """Cantidad de vecinos abiertos de cada celda."""
+    opened = np.pad(grid == 0, 1)
+    count = (opened[:-2, 1:-1].astype(np.int8) + opened[2:, 1:-1] +
+             opened[1:-1, :-2] + opened[1:-1, 2:])
+    return np.where(grid == 0, count, 0)
+
+
+def dead_ends(grid):
+    """Celdas de camino con un solo vecino abierto."""
+    return [tuple(p) for p in np.argwhere((grid == 0) & (open_neighbours(grid) == 1))]
+
+
+def distance_field(grid, goal):
+    """Distancia en pasos de cada celda a la meta por BFS; -1 si es pared o no llega."""
+    rows, cols = grid.shape
+    dist = np.full((rows, cols), -1, dtype=np.int32)
+    if grid[goal]:
+        return dist
+    dist[goal] = 0
+    queue = deque([goal])
+    while queue:
+        r, c = queue.popleft()
+        d = dist[r, c] + 1
+        for dr, dc in NEIGHBOURS:
+            nr, nc = r + dr, c + dc
+            if 0 <= nr < rows and 0 <= nc < cols and not grid[nr, nc] and dist[nr, nc] < 0:
+                dist[nr, nc] = d
+                queue.append((nr, nc))
+    return dist
+
+
+def is_solvable(grid, start, goal):
+    return distance_field(grid, goal)[start] >= 0
+
+
+def shortest_path(dist, start):
+    """Camino más corto desde start siguiendo el campo de distancias hacia la meta."""
+    if dist[start] < 0:
+        return []
+    path = [start]
+    while dist[path[-1]] > 0:
+        path.append(next_step(dist, path[-1]))
+    return path
+
+
+def next_step(dist, position):
+    """Celda vecina que acerca a la meta (sirve como pista)."""
+    r, c = position
+    for dr, dc in NEIGHBOURS:
+        nr, nc = r + dr, c + dc
+        if 0 <= nr < dist.shape[0] and 0 <= nc < dist.shape[1] and dist[nr, nc] == dist[r, c] - 1:
+            return (nr, nc)
+    return None
+
+
+def maze_metrics(grid, start, goal, dist=None):
+    """Métricas de dificultad: largo de la solución, decisiones en ella y callejones."""
+    if dist is None:
+        dist = distance_field(grid, goal)
+    path = shortest_path(dist, start)
+    neighbours = open_neighbours(grid)
+    junctions = sum(1 for p in path if neighbours[p] > 2)
+    open_cells = int((grid == 0).sum())
+    return {
+        "solvable": bool(path),
+        "path_length": len(path) - 1,
+        "junctions_on_path": junctions,
+        "dead_ends": len(dead_ends(grid)),
+        "branching_factor": float(neighbours[neighbours > 2].mean() - 1) if (neighbours > 2).any() else 1.0,
+        "open_cells": open_cells,
+    }
+
+
+def difficulty_score(metrics):
+    """Puntuación de dificultad: largo de la solución más el costo de cada decisión."""
+    return metrics["path_length"] + 3 * metrics["junctions_on_path"]
+
+
+def generate_for_difficulty(difficulty, seed=None, size=None, attempts=20):
+    """Genera un laberinto soluble cuya puntuación cae en el rango de la dificultad.
+
+    Un tamaño par se redondea al impar siguiente, para que la meta en la
+    esquina sea camino. Devuelve (grid, start, goal, dist, metrics).
+    """
+    params = DIFFICULTIES[difficulty]
+    rows, cols = (n | 1 for n in (size or params["size"]))
+    low, high = params["target"]
+    base = random.Random(seed).randrange(2 ** 31)
+    start, goal = (0, 0), (rows - 1, cols - 1)
+
+    best = None
+    for attempt in range(attempts):
+        grid = generate_maze(rows, cols, base + attempt, params["algorithm"])
+        braid(grid, params["braid"], base + attempt)
+        dist = distance_field(grid, goal)
+        metrics = maze_metrics(grid, start, goal, dist)
+        if not metrics["solvable"]:
+            continue
+        score = difficulty_score(metrics)
+        miss = max(low - score, score - high, 0)
+        if best is None or miss < best[0]:
+            best = (miss, (grid, start, goal, dist, metrics))
+        if miss == 0:
+            break
+    if best is None:
+        raise ValueError("ningún laberinto de %dx%d resultó soluble en %d intentos" % (rows, cols, attempts))
+    return best[1]
+
+
+def walls_list(grid):
+    """Paredes como lista de (columna, fila), el formato de VirtualPen.MazeGame."""
+    return [(int(c), int(r)) for r, c in np.argwhere(grid)]
+
+
+def score_run(dist, start, moves):
+    """Puntaje de 0 a 100: pasos mínimos sobre pasos usados."""
+    optimal = int(dist[start])
+    if moves <= 0 or optimal <= 0:
+        return 100
+    return int(round(100 * min(1.0, optimal / float(moves))))
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Pruebas de colisión de un trazo contra la rejilla del laberinto, indexada por (fila, columna)
+"""
+
+import math
+import numpy as np
+
+
+def cells_on_segment(p0, p1, cell_size):
+    """Celdas (fila, columna) que atraviesa el segmento p0-p1 en píxeles (x, y), en orden.
+
+    Es el recorrido de Amanatides-Woo: una celda por cada línea de la
+    rejilla que cruza el segmento.
+    """
+    x0, y0 = p0[0] / float(cell_size), p0[1] / float(cell_size)
+    x1, y1 = p1[0] / float(cell_size), p1[1] / float(cell_size)
+    i, j = int(math.floor(x0)), int(math.floor(y0))
+    i_end, j_end = int(math.floor(x1)), int(math.floor(y1))
+    dx, dy = x1 - x0, y1 - y0
+
+    step_i = 1 if dx > 0 else -1
+    step_j = 1 if dy > 0 else -1
+    t_max_x = ((i + (step_i > 0)) - x0) / dx if dx else math.inf
+    t_max_y = ((j + (step_j > 0)) - y0) / dy if dy else math.inf
+    t_delta_x = abs(1.0 / dx) if dx else math.inf
+    t_delta_y = abs(1.0 / dy) if dy else math.inf
+
+    cells = [(j, i)]
+    for _ in range(abs(i_end - i) + abs(j_end - j)):
+        if t_max_x < t_max_y:
+            i += step_i
+            t_max_x += t_delta_x
+        else:
+            j += step_j
+            t_max_y += t_delta_y
+        cells.append((j, i))
+    return cells
+
+
+def segment_hits_wall(grid, cell_size, p0, p1):
+    """Primera celda (fila, columna) de pared que cruza el segmento p0-p1, o None.
+
+    Al revisar todo el trayecto entre dos lecturas, un trazo rápido no
+    puede atravesar una pared sin que se detecte. Fuera de la rejilla no
+    hay paredes.
+    """
+    cells = np.array(cells_on_segment(p0, p1, cell_size))
+    r, c = cells[:, 0], cells[:, 1]
+    inside = (r >= 0) & (r < grid.shape[0]) & (c >= 0) & (c < grid.shape[1])
+    hits = np.zeros(len(cells), dtype=bool)
+    hits[inside] = grid[r[inside], c[inside]]
+    if not hits.any():
+        return None
+    first = int(hits.argmax())
+    return int(r[first]), int(c[first])
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Dibujo del laberinto como una sola imagen del canvas
+"""
+
+import numpy as np
+import tkinter as tk
+
+# Colores (RGB) de las celdas según su valor en la matriz de índices
+PATH, WALL, START, GOAL, VISITED = range(5)
+PALETTE = np.array([
+    (255, 255, 255),  # Camino
+    (0, 0, 0),        # Pared
+    (0, 128, 0),      # Inicio
+    (255, 0, 0),      # Meta
+    (200, 225, 255),  # Celda ya visitada
+], dtype=np.uint8)
+
+
+def rasterize(cells, cell_size, palette=PALETTE):
+    """Convierte una matriz (filas, columnas) de índices de color en una imagen RGB."""
+    image = palette[cells]
+    return np.ascontiguousarray(image.repeat(cell_size, axis=0).repeat(cell_size, axis=1))
+
+
+def to_ppm(image):
+    """Codifica una imagen RGB como PPM binario, que Tk carga sin librerías extra."""
+    height, width = image.shape[:2]
+    return b"P6 %d %d 255\n" % (width, height) + np.ascontiguousarray(image).tobytes()
+
+
+class MazeImage:
+    """Imagen del laberinto en un solo ítem del canvas; sólo se reenvían las regiones que cambian."""
+
+    def __init__(self, canvas, image):
+        self.image = image
+        self.photo = tk.PhotoImage(master=canvas, data=to_ppm(image), format="PPM")
+        self.item = canvas.create_image(0, 0, image=self.photo, anchor="nw")
+        canvas.tag_lower(self.item)
+
+    def update_region(self, x0, y0, x1, y1):
+        """Copia a Tk sólo el rectángulo [x0, x1) x [y0, y1) de la imagen."""
+        region = self.image[y0:y1, x0:x1]
+        self.photo.tk.call(self.photo.name, "put", to_ppm(region), "-format", "ppm", "-to", x0, y0)
+
+    def paint_cells(self, cells, color, cell_size):
+        """Pinta celdas (fila, columna) del color dado y actualiza sólo su región."""
+        if not cells:
+            return
+        cells = np.asarray(cells)
+        for r, c in cells:
+            self.image[r * cell_size:(r + 1) * cell_size, c * cell_size:(c + 1) * cell_size] = color
+        r0, c0 = cells.min(axis=0)
+        r1, c1 = cells.max(axis=0) + 1
+        self.update_region(c0 * cell_size, r0 * cell_size, c1 * cell_size, r1 * cell_size)
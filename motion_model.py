@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Modelos de movimiento para suavizar y adelantar el centro del lápiz
+"""
+
+import numpy as np
+
+
+class AlphaBetaFilter:
+    """Filtro alfa-beta de velocidad constante."""
+
+    def __init__(self, alpha=0.6, beta=0.15, max_coast=5):
+        self.alpha = alpha
+        self.beta = beta
+        self.max_coast = max_coast  # Cuadros seguidos que se predicen sin medición
+        self.reset()
+
+    def reset(self):
+        self.pos = None
+        self.vel = np.zeros(2)
+        self.t = None
+        self.coast = 0
+
+    def update(self, measurement, t):
+        """Incorpora una medición (o None) tomada en el instante t y devuelve la estimación."""
+        if self.pos is None:
+            if measurement is None:
+                return None
+            self.pos = np.array(measurement, dtype=float)
+            self.t = t
+            return self.pos.copy()
+
+        dt = max(t - self.t, 1e-3)
+        predicted = self.pos + self.vel * dt
+        self.t = t
+
+        if measurement is None:
+            return self._coast(predicted)
+
+        self.coast = 0
+        residual = np.asarray(measurement, dtype=float) - predicted
+        self.pos = predicted + self.alpha * residual
+        self.vel = self.vel + (self.beta / dt) * residual
+        return self.pos.copy()
+
+    def _coast(self, predicted):
+        self.coast += 1
+        if self.coast > self.max_coast:
+            self.reset()
+            return None
+        self.pos = predicted
+        return predicted.copy()
+
+    def predict(self, t):
+        """Posición estimada en el instante t sin modificar el estado."""
+        if self.pos is None:
+            return None
+        return self.pos + self.vel * (t - self.t)
+
+
+class KalmanFilter:
+    """Filtro de Kalman de velocidad constante con estado (x, y, vx, vy)."""
+
+    def __init__(self, process_noise=1e6, measurement_noise=4.0, max_coast=5):
+        self.q = process_noise  # Varianza de la aceleración (px/s²)²
+        self.r = measurement_noise  # Varianza de la medición (px²)
+        self.max_coast = max_coast
+        self.H = np.array([[1.0, 0, 0, 0], [0, 1.0, 0, 0]])
+        self.reset()
+
+    def reset(self):
+        self.x = None
+        self.P = None
+        self.t = None
+        self.coast = 0
+
+    def _transition(self, dt):
+        F = np.eye(4)
+        F[0, 2] = F[1, 3] = dt
+        return F
+
+    def _process_noise(self, dt):
+        a, b, c = dt ** 4 / 4, dt ** 3 / 2, dt ** 2
+        return self.q * np.array([
+            [a, 0, b, 0],
+            [0, a, 0, b],
+            [b, 0, c, 0],
+            [0, b, 0, c],
+        ])
+
+    def update(self, measurement, t):
+        """Incorpora una medición (o None) tomada en el instante t y devuelve la estimación."""
+        if self.x is None:
+            if measurement is None:
+                return None
+            self.x = np.array([measurement[0], measurement[1], 0.0, 0.0])
+            self.P = np.diag([self.r, self.r, 1e4, 1e4])
+            self.t = t
+            return self.x[:2].copy()
+
+        dt = max(t - self.t, 1e-3)
+        F = self._transition(dt)
+        self.x = F @ self.x
+        self.P = F @ self.P @ F.T + self._process_noise(dt)
+        self.t = t
+
+        if measurement is None:
+            self.coast += 1
+            if self.coast > self.max_coast:
+                self.reset()
+                return None
+            return self.x[:2].copy()
+
+        self.coast = 0
+        residual = np.asarray(measurement, dtype=float) - self.H @ self.x
+        S = self.H @ self.P @ self.H.T + self.r * np.eye(2)
+        K = self.P @ self.H.T @ np.linalg.inv(S)
+        self.x = self.x + K @ residual
+        self.P = (np.eye(4) - K @ self.H) @ self.P
+        return self.x[:2].copy()
+
+    def predict(self, t):
+        """Posición estimada en el instante t sin modificar el estado."""
+        if self.x is None:
+            return None
+        return (self._transition(t - self.t) @ self.x)[:2]
+
+
+# Modelos disponibles para la etapa de movimiento
+MOTION_MODELS = {
+    "Sin filtro": None,
+    "Alfa-beta": AlphaBetaFilter,
+    "Kalman": KalmanFilter,
+}
+
+
+class MotionStage:
+    """Etapa entre la extracción del centro y la estela: filtra y compensa la latencia."""
+
+    def __init__(self, model=None, compensate_latency=True, max_lead=0.1):
+        self.model = model
+        self.compensate_latency = compensate_latency
+        self.max_lead = max_lead  # Máximo adelanto en segundos
+        self.latency = None  # Latencia media medida (captura -> render), en segundos
+        self.target = None  # Instante al que corresponde el último centro devuelto
+
+    def process(self, center, t_capture, now):
+        """Devuelve el centro filtrado y adelantado por la latencia media medida."""
+        sample = now - t_capture
+        self.latency = sample if self.latency is None else 0.9 * self.latency + 0.1 * sample
+        self.target = t_capture
+        if self.model is None:
+            return center
+
+        estimate = self.model.update(center, t_capture)
+        if estimate is None:
+            return None
+        if self.compensate_latency:
+            # La media suaviza los saltos de un cuadro lento en la predicción
+            self.target = t_capture + min(self.latency, self.max_lead)
+            estimate = self.model.predict(self.target)
+        return (int(round(estimate[0])), int(round(estimate[1])))
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Seguimiento de varios lápices a la vez, cada uno con su propia estela
+"""
+
+import numpy as np
+import cv2
+
+import tracker
+from lut_segmenter import LutSegmenter
+from trail_renderer import Trail, TrailLayer
+
+# Color de dibujo (BGR) según la clase que devuelve ColorLabeler
+LABEL_COLORS = {
+    "red": (0, 0, 255),
+    "green": (0, 255, 0),
+    "blue": (255, 0, 0),
+}
+
+# Rangos HSV (inferior, superior) de cada clase que se busca a la vez; el rojo
+# da la vuelta al tono y necesita dos
+PEN_RANGES = [
+    ("red", (0, 120, 70), (10, 255, 255)),
+    ("red", (170, 120, 70), (179, 255, 255)),
+    ("green", (29, 86, 6), (64, 255, 255)),
+    ("blue", (100, 150, 50), (130, 255, 255)),
+]
+
+# Colores para distinguir lápices de la misma clase o sin clase
+PEN_COLORS = [
+    (0, 0, 255), (0, 255, 0), (255, 0, 0), (0, 255, 255),
+    (255, 0, 255), (255, 255, 0), (0, 128, 255), (128, 0, 128),
+]
+
+
+class Pen:
+    """Lápiz con identificador persistente, clase de color y estela propia.
+
+    id no se repite nunca; slot (0 a max_pens - 1) se reutiliza cuando un
+    lápiz se olvida, y es la clave acotada para el canvas y las grabaciones.
+    """
+
+    def __init__(self, pen_id, label, color, center, slot=0):
+        self.id = pen_id
+        self.slot = slot
+        self.label = label
+        self.color = color
+        self.pts = Trail()
+        self.pts.appendleft(center)
+        self.trail = TrailLayer()
+        self.misses = 0
+
+    @property
+    def position(self):
+        """Última posición conocida (aunque se haya perdido en los últimos cuadros)."""
+        for p in self.pts:
+            if p is not None:
+                return p
+        return None
+
+
+class MultiPenTracker:
+    """Asigna los contornos de cada cuadro a lápices persistentes por el centro más cercano."""
+
+    def __init__(self, labeler=None, max_pens=8, max_distance=80, max_misses=15, min_area=80,
+                 ranges=PEN_RANGES):
+        self.labeler = labeler  # ColorLabeler opcional para la identidad de clase
+        # Una clase de la tabla por rango: la máscara de todos los lápices es su unión
+        self.segmenter = LutSegmenter()
+        for k, (label, lower, upper) in enumerate(ranges):
+            self.segmenter.set_range("%s:%d" % (label, k), lower, upper)
+        self.max_pens = max_pens
+        self.max_distance = max_distance  # Salto máximo en píxeles entre cuadros
+        self.max_misses = max_misses  # Cuadros sin detección antes de olvidar un lápiz
+        self.min_area = min_area
+        self.pens = []
+        self.next_id = 0
+
+    def segment(self, frame):
+        """Máscara de todos los rangos de color en una sola consulta a la tabla."""
+        return tracker.segment_lut(frame, self.segmenter, None)
+
+    def detect(self, frame, mask):
+        """Devuelve los centros y clases de los contornos candidatos."""
+        cnts = [c for c in tracker.find_contours(mask) if cv2.contourArea(c) >= self.min_area]
+        cnts = sorted(cnts, key=cv2.contourArea, reverse=True)[:2 * self.max_pens]
+
+        centers, kept = [], []
+        for c in cnts:
+            center = tracker.contour_center(c)
+            if center is not None:
+                centers.append(center)
+                kept.append(c)
+
+        labels = [None] * len(kept)
+        if self.labeler is not None and kept:
+            lab = cv2.cvtColor(frame, cv2.COLOR_BGR2LAB)
+            labels = self.labeler.label_many(lab, kept)
+        return centers, labels
+
+    def match(self, centers, labels):
+        """Emparejamiento voraz por distancia; sólo entre la misma clase de color."""
+        if not self.pens or not centers:
+            return []
+
+        last = np.array([p.position for p in self.pens], dtype=float)
+        det = np.array(centers, dtype=float)
+        d = np.linalg.norm(last[:, None, :] - det[None, :, :], axis=2)
+        same = np.array([[p.label == l for l in labels] for p in self.pens])
+        d[~same | (d > self.max_distance)] = np.inf
+
+        pairs = []
+        used_pens, used_dets = set(), set()
+        for flat in np.argsort(d, axis=None):
+            i, j = divmod(int(flat), d.shape[1])
+            if not np.isfinite(d[i, j]):
+                break
+            if i in used_pens or j in used_dets:
+                continue
+            pairs.append((i, j))
+            used_pens.add(i)
+            used_dets.add(j)
+        return pairs
+
+    def update(self, frame, mask=None):
+        """Procesa un cuadro y devuelve la lista de lápices activos."""
+        if mask is None:
+            mask = self.segment(frame)
+        return self.assign(*self.detect(frame, mask))
+
+    def assign(self, centers, labels):
+        """Asigna las detecciones de un cuadro a los lápices y devuelve los activos."""
+        pairs = self.match(centers, labels)
+
+        matched_pens = {i for i, _ in pairs}
+        matched_dets = {j for _, j in pairs}
+        for i, j in pairs:
+            pen = self.pens[i]
+            pen.pts.appendleft(centers[j])
+            pen.misses = 0
+        for i, pen in enumerate(self.pens):
+            if i not in matched_pens:
+                pen.pts.appendleft(None)
+                pen.misses += 1
+        self.pens = [p for p in self.pens if p.misses <= self.max_misses]
+
+        # Los contornos sin dueño se vuelven lápices nuevos
+        for j, center in enumerate(centers):
+            if j in matched_dets or len(self.pens) >= self.max_pens:
+                continue
+            self.pens.append(Pen(self.next_id, labels[j], self._color_for(labels[j]), center,
+                                 self._free_slot()))
+            self.next_id += 1
+        return self.pens
+
+    def _free_slot(self):
+        used = {p.slot for p in self.pens}
+        return next(slot for slot in range(self.max_pens) if slot not in used)
+
+    def _color_for(self, label):
+        if label in LABEL_COLORS and all(p.label != label for p in self.pens):
+            return LABEL_COLORS[label]
+        used = {p.color for p in self.pens}
+        for color in PEN_COLORS:
+            if color not in used:
+                return color
+        return PEN_COLORS[self.next_id % len(PEN_COLORS)]
+
+    def render(self, frame):
+        """Dibuja la estela de cada lápiz."""
+        for pen in self.pens:
+            pen.trail.render(frame, pen.pts, pen.color)
+
+    def clear(self):
+        """Olvida los lápices: un lápiz sin posición no se puede emparejar."""
+        self.pens = []
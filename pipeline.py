@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Pipeline por etapas (captura, segmentación y render) para el lápiz virtual
+"""
+
+import threading
+import time
+from collections import deque
+
+# Valor que una etapa devuelve para detener todo el pipeline
+STOP = object()
+
+
+class DropOldestQueue:
+    """Cola acotada que descarta el elemento más antiguo cuando está llena.
+
+    on_drop(item) recibe cada elemento descartado, p. ej. para devolver su buffer.
+    """
+
+    def __init__(self, maxsize=1, on_drop=None):
+        self.items = deque(maxlen=maxsize)
+        self.cond = threading.Condition()
+        self.dropped = 0
+        self.closed = False
+        self.on_drop = on_drop
+
+    def put(self, item):
+        """Agrega un elemento, descartando el más antiguo si no hay espacio."""
+        old = None
+        with self.cond:
+            if len(self.items) == self.items.maxlen:
+                self.dropped += 1
+                old = self.items.popleft()
+            self.items.append(item)
+            self.cond.notify()
+        if old is not None and self.on_drop is not None:
+            self.on_drop(old)
+
+    def get(self, timeout=None):
+        """Saca el siguiente elemento; devuelve None si se cierra o vence el tiempo."""
+        with self.cond:
+            if not self.items and not self.closed:
+                self.cond.wait(timeout)
+            if not self.items:
+                return None
+            return self.items.popleft()
+
+    def close(self):
+        """Despierta a quien esté esperando y no acepta más esperas."""
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+
+    def __len__(self):
+        return len(self.items)
+
+
+class StageStats:
+    """Contadores de rendimiento de una etapa."""
+
+    def __init__(self, name):
+        self.name = name
+        self.count = 0
+        self.busy = 0.0
+        self.fps = 0.0
+        self.window_start = time.perf_counter()
+        self.window_count = 0
+
+    def record(self, elapsed):
+        """Registra un elemento procesado y actualiza los cuadros por segundo."""
+        self.count += 1
+        self.busy += elapsed
+        self.window_count += 1
+        now = time.perf_counter()
+        span = now - self.window_start
+        if span >= 1.0:
+            self.fps = self.window_count / span
+            self.window_start = now
+            self.window_count = 0
+
+    def mean_ms(self):
+        """Tiempo medio de trabajo por elemento en milisegundos."""
+        return 1000.0 * self.busy / self.count if self.count else 0.0
+
+
+class Stage(threading.Thread):
+    """Hilo que toma elementos de una cola, los procesa y los pasa a la siguiente."""
+
+    def __init__(self, name, work, inbox, outbox, stop_event):
+        super().__init__(name=name, daemon=True)
+        self.work = work
+        self.inbox = inbox
+        self.outbox = outbox
+        self.stop_event = stop_event
+        self.stats = StageStats(name)
+
+    def run(self):
+        try:
+            while not self.stop_event.is_set():
+                item = None
+                if self.inbox is not None:
+                    item = self.inbox.get(timeout=0.1)
+                    if item is None:
+                        continue
+
+                start = time.perf_counter()
+                result = self.work(item)
+                if result is STOP:
+                    break
+                if result is None:
+                    continue
+                self.stats.record(time.perf_counter() - start)
+
+                if self.outbox is not None:
+                    self.outbox.put(result)
+        finally:
+            self.stop_event.set()
+
+
+class TrackingPipeline:
+    """Une las etapas de captura, segmentación y render con colas acotadas.
+
+    on_drop(item) recibe lo que las colas descartan, en cualquiera de las dos.
+    """
+
+    def __init__(self, capture, segment, render, queue_size=1, on_drop=None):
+        self.stop_event = threading.Event()
+        self.frames = DropOldestQueue(queue_size, on_drop)
+        self.results = DropOldestQueue(queue_size, on_drop)
+        self.stages = [
+            Stage("captura", capture, None, self.frames, self.stop_event),
+            Stage("segmentacion", segment, self.frames, self.results, self.stop_event),
+            Stage("render", render, self.results, None, self.stop_event),
+        ]
+
+    def start(self):
+        for stage in self.stages:
+            stage.start()
+        return self
+
+    def stop(self):
+        self.stop_event.set()
+        self.frames.close()
+        self.results.close()
+
+    def join(self, timeout=None):
+        for stage in self.stages:
+            stage.join(timeout)
+
+    def wait(self, timeout=None):
+        """Espera hasta que el pipeline se detenga; devuelve True si se detuvo."""
+        return self.stop_event.wait(timeout)
+
+    def report(self):
+        """Devuelve un resumen de rendimiento por etapa y profundidad de colas."""
+        queues = {"captura": self.frames, "segmentacion": self.results}
+        lines = []
+        for stage in self.stages:
+            line = "{}: {:.1f} fps, {:.1f} ms".format(
+                stage.name, stage.stats.fps, stage.stats.mean_ms())
+            queue = queues.get(stage.name)
+            if queue is not None:
+                line += ", cola {} (descartados {})".format(len(queue), queue.dropped)
+            lines.append(line)
+        return "\n".join(lines)
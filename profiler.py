@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Perfilador por etapas: percentiles móviles, HUD sobre el cuadro y volcado en JSON o CSV
+"""
+
+import atexit
+import csv
+import functools
+import json
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+
+
+class _NullSection:
+    """Sección que no mide nada; se reutiliza cuando el perfilador está apagado."""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+NULL_SECTION = _NullSection()
+
+
+class _Section:
+    __slots__ = ("stats", "start")
+
+    def __init__(self, stats):
+        self.stats = stats
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.stats.record(time.perf_counter() - self.start)
+        return False
+
+
+class StageTimes:
+    """Últimos tiempos de una etapa en un arreglo circular."""
+
+    def __init__(self, name, window=300):
+        self.name = name
+        self.samples = np.zeros(window)
+        self.index = 0
+        self.count = 0  # Total de mediciones, no sólo las de la ventana
+
+    def record(self, elapsed):
+        self.samples[self.index] = elapsed
+        self.index = (self.index + 1) % len(self.samples)
+        self.count += 1
+
+    def percentiles(self):
+        """p50, p95, p99 y media en milisegundos sobre la ventana."""
+        ms = self.samples[:min(self.count, len(self.samples))] * 1000.0
+        if not len(ms):
+            return OrderedDict([("p50", 0.0), ("p95", 0.0), ("p99", 0.0), ("mean", 0.0)])
+        p50, p95, p99 = np.percentile(ms, (50, 95, 99))
+        return OrderedDict([("p50", float(p50)), ("p95", float(p95)), ("p99", float(p99)),
+                            ("mean", float(ms.mean()))])
+
+
+class Profiler:
+    """Tiempos por etapa; apagado, cada sección cuesta una llamada y un if."""
+
+    def __init__(self, window=300):
+        self.window = window
+        self.enabled = False
+        self.stages = OrderedDict()  # Nombre -> StageTimes, en orden de registro
+        self.lock = threading.Lock()  # Las etapas se registran desde los hilos del pipeline
+        self.hooks = []
+        self.frames = 0
+        self.started = None
+        self.hud_lines = []
+
+    def enable(self, dump=None):
+        """Empieza a medir; si se da dump, el informe se escribe ahí al salir."""
+        self.enabled = True
+        self.started = time.perf_counter()
+        self.frames = 0
+        if dump:
+            atexit.register(self.dump, dump)
+
+    def disable(self):
+        self.enabled = False
+
+    def register(self, name):
+        """Reserva una etapa (p. ej. desde un módulo nuevo) para que aparezca en el informe."""
+        stats = self.stages.get(name)
+        if stats is None:
+            with self.lock:
+                stats = self.stages.get(name)
+                if stats is None:
+                    stats = self.stages[name] = StageTimes(name, self.window)
+        return stats
+
+    def section(self, name):
+        """Bloque with que mide una etapa."""
+        if not self.enabled:
+            return NULL_SECTION
+        return _Section(self.register(name))
+
+    def record(self, name, elapsed):
+        if self.enabled:
+            self.register(name).record(elapsed)
+
+    def wrap(self, name):
+        """Decorador que mide cada llamada a la función como la etapa name."""
+        def decorator(function):
+            @functools.wraps(function)
+            def timed(*args, **kwargs):
+                if not self.enabled:
+                    return function(*args, **kwargs)
+                with _Section(self.register(name)):
+                    return function(*args, **kwargs)
+            return timed
+        return decorator
+
+    def add_hook(self, callback):
+        """callback(profiler) se llama al cerrar cada cuadro."""
+        self.hooks.append(callback)
+
+    def frame_done(self):
+        if not self.enabled:
+            return
+        self.frames += 1
+        for hook in self.hooks:
+            hook(self)
+
+    @property
+    def fps(self):
+        if not self.started or not self.frames:
+            return 0.0
+        return self.frames / (time.perf_counter() - self.started)
+
+    def report(self):
+        # Copia de las etapas: otro hilo puede registrar una mientras se recorren
+        with self.lock:
+            stages = list(self.stages.items())
+        return OrderedDict((name, stats.percentiles()) for name, stats in stages if stats.count)
+
+    def draw_hud(self, frame, origin=(10, 20), color=(0, 255, 0), every=15):
+        """Escribe p50 y p95 de cada etapa sobre el cuadro; el texto se recalcula cada every cuadros."""
+        if not self.enabled:
+            return
+        import cv2
+        if not self.hud_lines or self.frames % every == 0:
+            self.hud_lines = ["%.1f fps" % self.fps] + [
+                "%-12s %5.2f %5.2f ms" % (name, stats["p50"], stats["p95"])
+                for name, stats in self.report().items()]
+        x, y = origin
+        for line in self.hud_lines:
+            cv2.putText(frame, line, (x, y), cv2.FONT_HERSHEY_PLAIN, 1.0, color, 1)
+            y += 15
+
+    def dump(self, path):
+        """Escribe el informe en JSON, o en CSV si el archivo termina en .csv."""
+        report = self.report()
+        if path.endswith(".csv"):
+            with open(path, "w", newline="") as f:
+                writer = csv.writer(f)
+                writer.writerow(["stage", "count", "p50_ms", "p95_ms", "p99_ms", "mean_ms"])
+                for name, stats in report.items():
+                    writer.writerow([name, self.stages[name].count] + ["%.4f" % v for v in stats.values()])
+        else:
+            with open(path, "w") as f:
+                json.dump(OrderedDict([("frames", self.frames), ("fps", self.fps), ("stages_ms", report)]),
+                          f, indent=2)
+
+
+# Perfilador compartido por el tracker, la aplicación y el benchmark
+PROFILER = Profiler()
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Seguimiento por región de interés: busca el lápiz cerca de su última posición
+"""
+
+from collections import deque
+
+
+class RoiTracker:
+    """Segmenta sólo una ventana alrededor de la posición prevista del lápiz."""
+
+    def __init__(self, min_half_size=60, speed_gain=2.5):
+        self.min_half_size = min_half_size  # Media ventana mínima en píxeles
+        self.speed_gain = speed_gain  # Cuánto crece la ventana con la velocidad
+        self.history = deque(maxlen=2)  # Últimos centros encontrados
+        self.window = None
+        self.roi_frames = 0
+        self.full_frames = 0
+
+    def predict_window(self, shape):
+        """Calcula la ventana (x0, y0, x1, y1) a partir del historial, o None."""
+        if not self.history or self.history[0] is None:
+            return None
+
+        x, y = self.history[0]
+        vx = vy = 0
+        if len(self.history) > 1 and self.history[1] is not None:
+            vx, vy = x - self.history[1][0], y - self.history[1][1]
+
+        # Centrar la ventana donde debería estar el lápiz en el siguiente cuadro
+        px, py = x + vx, y + vy
+        half = self.min_half_size + self.speed_gain * max(abs(vx), abs(vy))
+
+        h, w = shape[:2]
+        x0, y0 = max(int(px - half), 0), max(int(py - half), 0)
+        x1, y1 = min(int(px + half), w), min(int(py + half), h)
+        if x1 - x0 < 2 * self.min_half_size // 3 or y1 - y0 < 2 * self.min_half_size // 3:
+            return None
+        return (x0, y0, x1, y1)
+
+    def locate(self, frame, find):
+        """Busca el lápiz con find(region) en la ventana y, si no está, en todo el cuadro."""
+        self.window = self.predict_window(frame.shape)
+        center = None
+
+        if self.window is not None:
+            x0, y0, x1, y1 = self.window
+            found = find(frame[y0:y1, x0:x1])
+            if found is not None:
+                self.roi_frames += 1
+                center = (found[0] + x0, found[1] + y0)
+
+        # Se perdió el lápiz: volver a buscar en el cuadro completo
+        if center is None:
+            self.full_frames += 1
+            center = find(frame)
+
+        self.history.appendleft(center)
+        return center
+
+    def reset(self):
+        self.history.clear()
+        self.window = None
+
+    def roi_ratio(self):
+        """Fracción de cuadros resueltos sólo con la ventana."""
+        total = self.roi_frames + self.full_frames
+        return self.roi_frames / total if total else 0.0
@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Grabación de sesiones en un archivo binario de registros fijos y reproducción con memmap
+
+Ejemplo: python3 session_recorder.py clase.vps --at 120 --render clase.png
+"""
+
+import argparse
+import os
+import struct
+import time
+import numpy as np
+
+# Cabecera: firma, versión, tamaño del registro y hora de inicio (epoch)
+MAGIC = b"VPSESS"
+VERSION = 1
+HEADER = struct.Struct("<6sHHxxd")
+HEADER_SIZE = 32
+
+# Un registro por evento: 16 bytes, sin objetos de Python al leer
+RECORD = np.dtype([
+    ("t", "<u4"),          # Milisegundos desde el inicio de la sesión
+    ("x", "<i2"),
+    ("y", "<i2"),
+    ("kind", "u1"),
+    ("pen", "u1"),
+    ("color", "u1", (3,)), # RGB
+    ("code", "u1"),        # Dato extra del evento (p. ej. nivel del laberinto)
+    ("value", "<u2"),      # Dato extra del evento (p. ej. movimientos)
+])
+
+MAX_PEN = np.iinfo(RECORD["pen"]).max
+
+# Tipos de evento
+POINT, BREAK, CLEAR, MAZE_START, MAZE_WALL, MAZE_GOAL = range(6)
+KIND_NAMES = ("point", "break", "clear", "maze_start", "maze_wall", "maze_goal")
+
+
+def hex_to_rgb(color):
+    """'#rrggbb' -> (r, g, b); los trazos del canvas usan colores en hexadecimal."""
+    value = int(color.lstrip("#"), 16)
+    return (value >> 16) & 255, (value >> 8) & 255, value & 255
+
+
+class SessionRecorder:
+    """Agrega eventos al final del archivo; se guardan por bloques para no escribir en cada punto."""
+
+    def __init__(self, path, block=256):
+        self.path = path
+        exists = os.path.exists(path) and os.path.getsize(path) >= HEADER_SIZE
+        if exists:
+            with open(path, "rb") as f:
+                self.start = read_header(f)
+        else:
+            self.start = time.time()
+        self.file = open(path, "ab")
+        if not exists:
+            self.file.write(HEADER.pack(MAGIC, VERSION, RECORD.itemsize, self.start).ljust(HEADER_SIZE, b"\0"))
+        else:
+            # Descartar un registro a medias de una sesión que se cortó
+            size = os.path.getsize(path)
+            self.file.truncate(HEADER_SIZE + (size - HEADER_SIZE) // RECORD.itemsize * RECORD.itemsize)
+            self.file.seek(0, os.SEEK_END)
+        self.buffer = np.zeros(block, dtype=RECORD)
+        self.count = 0
+
+    def _append(self, kind, x=0, y=0, pen=0, color=(0, 0, 0), code=0, value=0, t=None):
+        if not 0 <= pen <= MAX_PEN:
+            raise ValueError("lápiz %d fuera del rango del registro (0-%d)" % (pen, MAX_PEN))
+        if t is None:
+            t = time.time()
+        record = self.buffer[self.count]
+        record["t"] = max(0, int((t - self.start) * 1000))
+        record["x"], record["y"] = x, y
+        record["kind"], record["pen"] = kind, pen
+        record["color"] = color
+        record["code"], record["value"] = code, value
+        self.count += 1
+        if self.count == len(self.buffer):
+            self.flush()
+
+    def point(self, center, color, pen=0, t=None):
+        if isinstance(color, str):
+            color = hex_to_rgb(color)
+        self._append(POINT, int(center[0]), int(center[1]), pen, color, t=t)
+
+    def break_stroke(self, pen=0, t=None):
+        self._append(BREAK, pen=pen, t=t)
+
+    def clear(self, t=None):
+        self._append(CLEAR, t=t)
+
+    def maze_event(self, kind, position=(0, 0), level=0, moves=0, t=None):
+        """kind es MAZE_START, MAZE_WALL o MAZE_GOAL."""
+        self._append(kind, int(position[0]), int(position[1]), code=level, value=min(moves, 65535), t=t)
+
+    def flush(self):
+        if self.count:
+            self.file.write(self.buffer[:self.count].tobytes())
+            self.file.flush()
+            self.count = 0
+
+    def close(self):
+        self.flush()
+        self.file.close()
+
+
+def read_header(f):
+    """Valida la cabecera y devuelve la hora de inicio de la sesión."""
+    magic, version, itemsize, start = HEADER.unpack(f.read(HEADER_SIZE)[:HEADER.size])
+    if magic != MAGIC or version != VERSION or itemsize != RECORD.itemsize:
+        raise ValueError("No es un archivo de sesión compatible")
+    return start
+
+
+class SessionReplay:
+    """Lee una sesión con memmap: acceso aleatorio y adelantar sin decodificar registro por registro."""
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self.start = read_header(f)
+        count = (os.path.getsize(path) - HEADER_SIZE) // RECORD.itemsize
+        if count:
+            self.records = np.memmap(path, dtype=RECORD, mode="r", offset=HEADER_SIZE, shape=(count,))
+        else:
+            self.records = np.zeros(0, dtype=RECORD)
+
+    def __len__(self):
+        return len(self.records)
+
+    def __getitem__(self, index):
+        return self.records[index]
+
+    @property
+    def duration(self):
+        """Duración en segundos."""
+        return self.records["t"][-1] / 1000.0 if len(self.records) else 0.0
+
+    def index_at(self, seconds):
+        """Cantidad de registros con tiempo <= seconds (búsqueda binaria)."""
+        return int(np.searchsorted(self.records["t"], int(seconds * 1000), side="right"))
+
+    def window(self, t0, t1):
+        """Registros entre t0 y t1 segundos, como vista del memmap."""
+        return self.records[self.index_at(t0):self.index_at(t1)]
+
+    def events(self, kinds):
+        """Registros de los tipos dados (p. ej. los eventos del laberinto)."""
+        return self.records[np.isin(self.records["kind"], kinds)]
+
+    def strokes(self, seconds=None):
+        """Trazos visibles en el instante dado: lista de (lápiz, color, puntos (N, 2))."""
+        end = len(self.records) if seconds is None else self.index_at(seconds)
+        records = self.records[:end]
+        clears = np.flatnonzero(records["kind"] == CLEAR)
+        if len(clears):
+            records = records[clears[-1] + 1:]
+
+        result = []
+        for pen in np.unique(records["pen"]):
+            own = records[(records["pen"] == pen) & ((records["kind"] == POINT) | (records["kind"] == BREAK))]
+            # Cada corte empieza un trazo nuevo; un cambio de color también
+            kind = own["kind"]
+            stroke_id = np.cumsum(kind == BREAK)
+            points = own[kind == POINT]
+            if not len(points):
+                continue
+            stroke_id = stroke_id[kind == POINT]
+            color_change = np.any(points["color"][1:] != points["color"][:-1], axis=1)
+            cuts = np.flatnonzero((np.diff(stroke_id) != 0) | color_change) + 1
+            xy = np.stack([points["x"], points["y"]], axis=1)
+            for segment, colors in zip(np.split(xy, cuts), np.split(points["color"], cuts)):
+                result.append((int(pen), tuple(int(c) for c in colors[0]), segment))
+        return result
+
+    def render(self, seconds=None, size=(400, 600), thickness=4):
+        """Dibuja el lienzo en el instante dado como imagen BGR."""
+        import cv2
+        image = np.full(size + (3,), 255, dtype=np.uint8)
+        for _, color, points in self.strokes(seconds):
+            cv2.polylines(image, [points.astype(np.int32).reshape(-1, 1, 2)], False,
+                          color[::-1], thickness, cv2.LINE_AA)
+        return image
+
+    def play(self, speed=1.0, start=0.0, block=64):
+        """Genera bloques de registros al ritmo original multiplicado por speed."""
+        index = int(np.searchsorted(self.records["t"], int(start * 1000), side="left"))
+        began = time.time()
+        while index < len(self.records):
+            chunk = self.records[index:index + block]
+            due = (chunk["t"][0] / 1000.0 - start) / speed
+            wait = due - (time.time() - began)
+            if wait > 0:
+                time.sleep(wait)
+            # Entregar juntos los registros que ya vencieron
+            elapsed = (time.time() - began) * speed + start
+            count = max(1, int(np.searchsorted(chunk["t"], int(elapsed * 1000), side="right")))
+            yield chunk[:count]
+            index += count
+
+    def close(self):
+        if isinstance(self.records, np.memmap):
+            self.records._mmap.close()
+
+
+def get_arguments():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('session', help='Session file written by VirtualPen --record')
+    ap.add_argument('--at', type=float, help='Time in seconds to render (default: end)')
+    ap.add_argument('--render', help='Write the canvas at --at to this image file')
+    ap.add_argument('--play', type=float, metavar='SPEED',
+                    help='Replay in a window at this speed (e.g. 4 for fast-forward)')
+    return vars(ap.parse_args())
+
+
+def main():
+    import cv2
+    args = get_arguments()
+    replay = SessionReplay(args['session'])
+    counts = np.bincount(replay.records["kind"], minlength=len(KIND_NAMES))
+    print("%d registros, %.1f s" % (len(replay), replay.duration))
+    for name, count in zip(KIND_NAMES, counts):
+        print("  %-10s %d" % (name, count))
+
+    if args['render']:
+        cv2.imwrite(args['render'], replay.render(args['at']))
+
+    if args['play']:
+        start = args['at'] or 0.0
+        for chunk in replay.play(args['play'], start):
+            t = chunk["t"][-1] / 1000.0
+            cv2.imshow("Replay", replay.render(t))
+            if cv2.waitKey(1) & 0xFF == ord("q"):
+                break
+        cv2.destroyAllWindows()
+
+
+if __name__ == '__main__':
+    main()
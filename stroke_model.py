@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Modelo de trazos: junta los centros del lápiz en polilíneas del canvas
+"""
+
+from collections import deque
+
+from stroke_simplify import StreamSimplifier
+
+
+class Stroke:
+    """Trazo en curso de un lápiz: un ítem del canvas y su polilínea simplificada."""
+
+    def __init__(self, pen, color, tolerance):
+        self.pen = pen
+        self.color = color
+        self.item = None
+        self.simplifier = StreamSimplifier(tolerance)
+        self.dirty = False
+
+    def points(self):
+        return self.simplifier.points()
+
+
+class StrokeModel:
+    """Acumula puntos en trazos y los pasa al canvas por lotes desde el hilo de Tk.
+
+    Cada trazo se simplifica a medida que llega: ningún punto del lápiz queda
+    a más de tolerance píxeles de la polilínea dibujada. Con la mitad del
+    ancho de línea la diferencia no se ve y el canvas guarda varias veces
+    menos vértices. smooth dibuja los trazos como splines de Tk.
+    """
+
+    def __init__(self, canvas, width=4, max_points=500, tolerance=2.0, smooth=False):
+        self.canvas = canvas
+        self.width = width
+        self.max_points = max_points  # Vértices por ítem antes de empezar uno nuevo
+        self.tolerance = tolerance
+        self.smooth = smooth
+        self.pending = deque()  # Puntos y cortes que llegan del hilo de video
+        self.strokes = {}  # Lápiz -> trazo en curso
+        self.finished = []  # Trazos terminados, para exportarlos y cambiar el suavizado
+
+    def add_point(self, point, color, pen=0):
+        """Encola un punto; se puede llamar desde cualquier hilo."""
+        self.pending.append((pen, point, color))
+
+    def break_stroke(self, pen=0):
+        """Encola un corte de trazo; se puede llamar desde cualquier hilo."""
+        self.pending.append((pen, None, None))
+
+    def flush(self):
+        """Pasa al canvas los puntos pendientes; debe llamarse desde el hilo de Tk."""
+        while self.pending:
+            pen, point, color = self.pending.popleft()
+            stroke = self.strokes.get(pen)
+            if point is None:
+                if stroke is not None:
+                    self._finish(stroke)
+                    del self.strokes[pen]
+                continue
+
+            if stroke is None or color != stroke.color:
+                if stroke is not None:
+                    self._finish(stroke)
+                stroke = self.strokes[pen] = Stroke(pen, color, self.tolerance)
+
+            # Los puntos repetidos o que el segmento actual ya cubre no cambian nada
+            if stroke.simplifier.push(tuple(point)):
+                stroke.dirty = True
+
+            # Limitar el tamaño de cada ítem: seguir en uno nuevo desde el último vértice
+            if len(stroke.simplifier) >= self.max_points:
+                self._finish(stroke)
+                last = stroke.points()[-1]
+                stroke = self.strokes[pen] = Stroke(pen, color, self.tolerance)
+                stroke.simplifier.push(last)
+                stroke.dirty = True
+
+        for stroke in self.strokes.values():
+            if stroke.dirty:
+                self._draw(stroke)
+
+    def _draw(self, stroke):
+        points = stroke.points()
+        if len(points) == 1:
+            points = points * 2  # Un solo punto se dibuja como un segmento nulo
+        coords = [c for point in points for c in point]
+        if stroke.item is None:
+            stroke.item = self.canvas.create_line(
+                *coords, fill=stroke.color, width=self.width, capstyle="round", joinstyle="round",
+                smooth=self.smooth)
+        else:
+            self.canvas.coords(stroke.item, *coords)
+        stroke.dirty = False
+
+    def _finish(self, stroke):
+        if stroke.dirty:
+            self._draw(stroke)
+        self.finished.append(stroke)
+
+    def set_smooth(self, smooth):
+        """Cambia el suavizado de todos los trazos, también los ya dibujados (hilo de Tk)."""
+        self.smooth = smooth
+        for stroke in self.finished + list(self.strokes.values()):
+            if stroke.item is not None:
+                self.canvas.itemconfigure(stroke.item, smooth=smooth)
+
+    def export(self):
+        """Trazos dibujados como lista de (lápiz, color '#rrggbb', puntos [(x, y), ...])."""
+        self.flush()
+        return [(stroke.pen, stroke.color, stroke.points())
+                for stroke in self.finished + list(self.strokes.values())]
+
+    def load(self, strokes):
+        """Dibuja trazos exportados (o leídos de un archivo) como trazos terminados."""
+        for pen, color, points in strokes:
+            stroke = Stroke(pen, color, self.tolerance)
+            # Ya vienen simplificados: se dibujan tal cual, sin volver a reducirlos
+            stroke.simplifier.vertices = [tuple(point) for point in points]
+            if stroke.simplifier.vertices:
+                self._draw(stroke)
+                self.finished.append(stroke)
+
+    def clear(self):
+        """Olvida los trazos; los ítems del canvas los borra quien llama."""
+        self.pending.clear()
+        self.strokes.clear()
+        self.finished = []
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Simplificación incremental de trazos con error acotado (sin dependencias de visión)
+"""
+
+
+def segment_distance2(point, a, b):
+    """Cuadrado de la distancia de point al segmento a-b."""
+    ax, ay = a
+    dx, dy = b[0] - ax, b[1] - ay
+    px, py = point[0] - ax, point[1] - ay
+    length2 = dx * dx + dy * dy
+    if length2 == 0:
+        return px * px + py * py
+    t = min(1.0, max(0.0, (px * dx + py * dy) / float(length2)))
+    ex, ey = px - t * dx, py - t * dy
+    return ex * ex + ey * ey
+
+
+class StreamSimplifier:
+    """Reduce los puntos de un trazo a medida que llegan.
+
+    Un punto a menos de min_distance del último guardado no se agrega
+    (distancia radial), pero se sigue controlando. Si no, se intenta estirar
+    el segmento que sale del último vértice fijo hasta el punto nuevo: si
+    todos los puntos que ese segmento saltea quedan a menos de tolerance, el
+    punto pasa a ser el extremo provisorio; si alguno queda más lejos (el
+    trazo dobló), el extremo anterior queda fijo como vértice. Ningún punto
+    recibido queda a más de max(tolerance, min_distance) de la polilínea.
+    """
+
+    def __init__(self, tolerance=1.5, min_distance=None, max_skipped=64):
+        self.tolerance = tolerance
+        self.min_distance = tolerance if min_distance is None else min_distance
+        self.max_skipped = max_skipped  # Tope de puntos salteados por segmento: acota el costo de cada push
+        self.vertices = []  # Vértices fijos
+        self.tail = None  # Extremo provisorio, sigue al lápiz
+        self.skipped = []  # Puntos entre el último vértice y tail que el segmento cubre
+        self.near = []  # Puntos descartados por cercanía desde el último punto guardado
+        self.received = 0
+
+    def push(self, point):
+        """Agrega un punto; devuelve True si cambió la polilínea."""
+        self.received += 1
+        if not self.vertices:
+            self.vertices.append(point)
+            return True
+        last = self.tail if self.tail is not None else self.vertices[-1]
+        dx, dy = point[0] - last[0], point[1] - last[1]
+        distance2 = dx * dx + dy * dy
+        if distance2 == 0 or distance2 < self.min_distance * self.min_distance:
+            if distance2:
+                self.near.append(point)
+            if len(self.near) >= self.max_skipped and self.tail is not None:
+                # Lápiz casi quieto: fijar tail, que ya está a menos de min_distance de todos
+                self.vertices.append(self.tail)
+                self.tail = None
+                self.skipped = self.near = []
+                return True
+            return False
+        if self.tail is None:
+            self.skipped = self.near
+        else:
+            run = self.skipped + [self.tail] + self.near
+            if len(run) <= self.max_skipped and self._covers(self.vertices[-1], point, run):
+                self.skipped = run
+            else:
+                # Los cercanos a tail quedan cubiertos por el segmento nuevo que sale de él
+                self.vertices.append(self.tail)
+                self.skipped = self.near
+        self.near = []
+        self.tail = point
+        return True
+
+    def _covers(self, a, b, run):
+        limit = self.tolerance * self.tolerance
+        return all(segment_distance2(q, a, b) <= limit for q in run)
+
+    def points(self):
+        """Polilínea actual: vértices fijos más el extremo provisorio."""
+        if self.tail is None:
+            return list(self.vertices)
+        return self.vertices + [self.tail]
+
+    def __len__(self):
+        return len(self.vertices) + (self.tail is not None)
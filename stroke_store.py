@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Dibujos guardados como trazos simplificados con coordenadas en deltas int16
+
+Ejemplo: python3 stroke_store.py clase.vps --out clase.vpk --render clase.png --smooth
+"""
+
+import argparse
+import os
+import struct
+import time
+import numpy as np
+
+from session_recorder import hex_to_rgb, HEADER_SIZE, MAX_PEN, RECORD, SessionReplay
+from stroke_simplify import StreamSimplifier, segment_distance2
+
+# Cabecera: firma, versión, cantidad de trazos y de puntos
+MAGIC = b"VPSTRK"
+VERSION = 1
+HEADER = struct.Struct("<6sHII")
+
+# Tabla de trazos, seguida de todos los puntos: (dx, dy) int16, el primero de cada trazo absoluto
+STROKE = np.dtype([
+    ("pen", "u1"),
+    ("color", "u1", (3,)),  # RGB
+    ("count", "<u4"),       # Puntos del trazo
+])
+POINT = np.dtype("<i2")
+
+
+def encode_deltas(points):
+    """Puntos (N, 2) -> diferencias int16 con el anterior; el primero queda absoluto."""
+    points = np.asarray(points, dtype=np.int32).reshape(-1, 2)
+    deltas = np.diff(points, axis=0, prepend=np.zeros((1, 2), np.int32))
+    if len(deltas) and (deltas.min() < -32768 or deltas.max() > 32767):
+        raise ValueError("Coordenadas fuera del rango de int16")
+    return deltas.astype(POINT)
+
+
+def decode_deltas(deltas, counts):
+    """Deshace encode_deltas de todos los trazos a la vez: una suma acumulada por eje.
+
+    La suma corre sobre todos los puntos seguidos y a cada trazo se le resta
+    lo acumulado hasta su primer punto, así no hace falta recorrerlos uno por uno.
+    """
+    total = np.cumsum(deltas, axis=0, dtype=np.int32)
+    starts = np.cumsum(counts) - counts
+    before = np.zeros((len(counts), 2), np.int32)
+    nonempty = counts > 0
+    before[nonempty] = total[starts[nonempty]] - deltas[starts[nonempty]]
+    return total - np.repeat(before, counts, axis=0)
+
+
+def save_strokes(path, strokes):
+    """Guarda una lista de (lápiz, color, puntos); color en RGB o '#rrggbb'."""
+    strokes = [(pen, color, points) for pen, color, points in strokes if len(points)]
+    table = np.zeros(len(strokes), dtype=STROKE)
+    chunks = []
+    for record, (pen, color, points) in zip(table, strokes):
+        if not 0 <= pen <= MAX_PEN:
+            raise ValueError("lápiz %d fuera del rango del archivo (0-%d)" % (pen, MAX_PEN))
+        record["pen"] = pen
+        record["color"] = hex_to_rgb(color) if isinstance(color, str) else color
+        record["count"] = len(points)
+        chunks.append(encode_deltas(points))
+    deltas = np.concatenate(chunks) if chunks else np.zeros((0, 2), POINT)
+    # Escribir a un temporal y reemplazar: un corte a mitad no pisa el dibujo anterior
+    partial = path + ".tmp"
+    with open(partial, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, len(table), len(deltas)))
+        f.write(table.tobytes())
+        f.write(deltas.tobytes())
+    os.replace(partial, path)
+
+
+def load_strokes(path):
+    """Lee un dibujo: lista de (lápiz, (r, g, b), puntos (N, 2) int32)."""
+    with open(path, "rb") as f:
+        data = f.read()
+    if len(data) < HEADER.size:
+        raise ValueError("No es un archivo de dibujo compatible")
+    magic, version, count, total = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("No es un archivo de dibujo compatible")
+    table = np.frombuffer(data, dtype=STROKE, count=count, offset=HEADER.size)
+    deltas = np.frombuffer(data, dtype=POINT, count=2 * total,
+                           offset=HEADER.size + table.nbytes).reshape(-1, 2)
+    counts = table["count"].astype(np.intp)
+    if counts.sum() != total:
+        raise ValueError("Archivo de dibujo dañado")
+    points = np.split(decode_deltas(deltas, counts), np.cumsum(counts)[:-1])
+    return [(int(record["pen"]), tuple(int(c) for c in record["color"]), segment)
+            for record, segment in zip(table, points)]
+
+
+def simplify_stream(points, tolerance=2.0):
+    """La misma simplificación que hace la pizarra mientras se dibuja."""
+    simplifier = StreamSimplifier(tolerance)
+    for point in points:
+        simplifier.push((int(point[0]), int(point[1])))
+    return np.array(simplifier.points(), dtype=np.int32).reshape(-1, 2)
+
+
+def simplify_rdp(points, tolerance=2.0):
+    """Ramer-Douglas-Peucker sobre el trazo completo (cv2.approxPolyDP): para trazos ya terminados.
+
+    approxPolyDP mide la distancia a la recta y no al segmento, así que en
+    las puntas de una curva cerrada el error puede pasar un poco de tolerance.
+    """
+    import cv2
+    points = np.asarray(points, dtype=np.int32).reshape(-1, 1, 2)
+    if len(points) < 3:
+        return points.reshape(-1, 2)
+    return cv2.approxPolyDP(points, tolerance, False).reshape(-1, 2)
+
+
+def max_error(points, simplified):
+    """Mayor distancia de un punto original a la polilínea simplificada."""
+    segments = list(zip(simplified[:-1], simplified[1:])) or [(simplified[0], simplified[0])]
+    return float(np.sqrt(max(min(segment_distance2(p, a, b) for a, b in segments) for p in points)))
+
+
+def smooth_polyline(points, steps=12):
+    """Curva que dibuja Tk con smooth=True: una parábola por vértice interior.
+
+    Cada tramo va del punto medio de un segmento al del siguiente con el
+    vértice como punto de control; los extremos del trazo se conservan.
+    """
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    if len(points) < 3:
+        return points
+    middles = (points[:-1] + points[1:]) / 2.0
+    starts = middles[:-1].copy()
+    ends = middles[1:].copy()
+    starts[0], ends[-1] = points[0], points[-1]
+    controls = points[1:-1]
+    t = np.linspace(0.0, 1.0, steps + 1)[1:, None, None]
+    curve = (1 - t) ** 2 * starts + 2 * t * (1 - t) * controls + t ** 2 * ends
+    # (pasos, tramos, 2) -> tramo por tramo, en orden
+    return np.vstack([points[:1], curve.transpose(1, 0, 2).reshape(-1, 2)])
+
+
+def render_strokes(strokes, size=(400, 600), thickness=4, smooth=False):
+    """Dibuja los trazos como imagen BGR, como SessionReplay.render."""
+    import cv2
+    image = np.full(size + (3,), 255, dtype=np.uint8)
+    # Con shift se dibuja con coordenadas fraccionarias: la curva suavizada no se escalona
+    shift = 4
+    for _, color, points in strokes:
+        line = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        if smooth and len(line) >= 3:
+            # Unos 4 px por paso alcanzan: más pasos sólo agregan segmentos que rasterizar
+            length = np.hypot(*np.diff(line, axis=0).T).mean()
+            line = smooth_polyline(line, int(np.clip(np.ceil(length / 4.0), 2, 12)))
+        fixed = np.round(line * (1 << shift)).astype(np.int32).reshape(-1, 1, 2)
+        cv2.polylines(image, [fixed], False, color[::-1], thickness, cv2.LINE_AA, shift)
+    return image
+
+
+def get_arguments():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('input', help='Session file (.vps) written by VirtualPen --record, or a drawing (.vpk)')
+    ap.add_argument('--at', type=float, help='Time in seconds of the session to convert (default: end)')
+    ap.add_argument('--tolerance', type=float, default=2.0,
+                    help='Maximum distance in pixels between the pen and the simplified stroke')
+    ap.add_argument('--rdp', action='store_true',
+                    help='Simplify whole strokes with Ramer-Douglas-Peucker instead of the streaming method')
+    ap.add_argument('--out', help='Write the simplified strokes to this drawing file')
+    ap.add_argument('--render', help='Write the drawing to this image file')
+    ap.add_argument('--smooth', action='store_true', help='Render strokes as splines')
+    return vars(ap.parse_args())
+
+
+def main():
+    import cv2
+    args = get_arguments()
+    with open(args['input'], "rb") as f:
+        is_drawing = f.read(len(MAGIC)) == MAGIC
+
+    if is_drawing:
+        start = time.perf_counter()
+        strokes = load_strokes(args['input'])
+        elapsed = time.perf_counter() - start
+        print("%d trazos, %d puntos, leídos en %.2f ms" % (
+            len(strokes), sum(len(points) for _, _, points in strokes), elapsed * 1000))
+    else:
+        replay = SessionReplay(args['input'])
+        raw = replay.strokes(args['at'])
+        simplify = simplify_rdp if args['rdp'] else simplify_stream
+        start = time.perf_counter()
+        strokes = [(pen, color, simplify(points, args['tolerance'])) for pen, color, points in raw]
+        elapsed = time.perf_counter() - start
+        before = sum(len(points) for _, _, points in raw)
+        after = sum(len(points) for _, _, points in strokes)
+        error = max([max_error(p, s) for (_, _, p), (_, _, s) in zip(raw, strokes)] or [0.0])
+        print("%d trazos: %d -> %d puntos (%.1fx) en %.1f ms, error máximo %.2f px" % (
+            len(strokes), before, after, before / float(max(after, 1)), elapsed * 1000, error))
+        if args['out']:
+            save_strokes(args['out'], strokes)
+            print("%d bytes (la sesión ocupa %d)" % (
+                os.path.getsize(args['out']), HEADER_SIZE + len(replay) * RECORD.itemsize))
+
+    if args['render']:
+        cv2.imwrite(args['render'], render_strokes(strokes, smooth=args['smooth']))
+
+
+if __name__ == '__main__':
+    main()
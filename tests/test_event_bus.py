@@ -0,0 +1,29 @@
+import os
+
+from event_bus import EventBus, TkBridge
+
+
+class FakeRoot:
+    """Raíz de Tk sin createfilehandler, como en Windows."""
+
+    class tk:
+        pass
+
+    def __init__(self):
+        self.scheduled = []
+
+    def after(self, ms, function):
+        self.scheduled.append((ms, function))
+
+
+def test_bridge_falls_back_to_polling_without_set_blocking(monkeypatch):
+    monkeypatch.delattr(os, "set_blocking")
+    bus = EventBus().start()
+    try:
+        root = FakeRoot()
+        bridge = TkBridge(root, bus, interval=16)
+        assert bridge.polling and bridge.wake_read is None
+        assert [ms for ms, _ in root.scheduled] == [16]
+        bridge.close()
+    finally:
+        bus.stop()
@@ -0,0 +1,27 @@
+import numpy as np
+
+from frame_buffers import FrameBuffers
+from pipeline import DropOldestQueue
+
+
+def test_acquired_frames_are_not_reused_until_released():
+    buffers = FrameBuffers(width=40, slots=2)
+    shape = (60, 80, 3)
+    first = buffers.acquire(shape)
+    second = buffers.acquire(shape)
+    assert first is not second
+    assert buffers.acquire(shape, timeout=0.01) is None
+    buffers.release(first)
+    assert buffers.acquire(shape, timeout=0.01) is first
+
+
+def test_dropped_items_give_their_frame_back():
+    buffers = FrameBuffers(width=40, slots=2)
+    raw = np.zeros((60, 80, 3), np.uint8)
+    queue = DropOldestQueue(1, on_drop=lambda item: buffers.release(item[1]))
+    for t in range(5):
+        out = buffers.acquire(raw.shape, timeout=0.01)
+        assert out is not None
+        queue.put((t, buffers.prepare(raw, out=out)))
+    assert queue.dropped == 4
+    assert len(buffers.free) == 1
@@ -0,0 +1,13 @@
+from lut_segmenter import LutSegmenter
+
+
+def test_set_range_swaps_the_table():
+    segmenter = LutSegmenter(bits=4)
+    segmenter.set_range("pen", (29, 86, 6), (64, 255, 255))
+    live = segmenter.table
+    before = live.copy()
+    segmenter.set_range("pen", (100, 86, 6), (130, 255, 255))
+    segmenter.remove_range("pen")
+    # Quien ya tenía la tabla sigue viendo la versión completa anterior
+    assert (live == before).all()
+    assert not segmenter.table.any()
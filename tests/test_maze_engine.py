@@ -0,0 +1,36 @@
+import numpy as np
+
+import maze_generator
+from maze_engine import MazeEngine, GOAL, WALL
+
+
+def test_batch_matches_per_step_replay():
+    grid, start, goal, dist, _ = maze_generator.generate_for_difficulty("easy", seed=3)
+    engine = MazeEngine(grid, 20, start, goal, dist)
+    rng = np.random.default_rng(0)
+    n, t = 2000, 40
+    trajectories = np.cumsum(rng.normal(0, 12, (n, t, 2)), axis=1) + 10
+    # Algunas siguen la solución, con ruido, para que también lleguen a la meta
+    path = np.array(maze_generator.shortest_path(dist, start))[:, ::-1] * 20.0 + 10
+    for k in range(0, n, 10):
+        walk = path + rng.normal(0, 3, path.shape)
+        trajectories[k, :min(t, len(walk))] = walk[:t]
+    lengths = rng.integers(0, t + 1, n)
+    for k, length in enumerate(lengths):
+        trajectories[k, length:] = np.nan
+
+    outcome, index = engine.simulate_batch(trajectories)
+    for k in range(n):
+        assert engine.simulate(trajectories[k, :lengths[k]]) == (outcome[k], index[k]), k
+    assert (outcome == WALL).any() and (outcome == GOAL).any()
+
+
+def test_batch_catches_corner_clips():
+    grid = np.zeros((3, 3), bool)
+    grid[0, 1] = True
+    engine = MazeEngine(grid, 10, (0, 0), (2, 2))
+    # Roza la esquina de la pared en (0, 1) durante menos de un píxel
+    trajectory = [(4, 3.2), (16, 15.2)]
+    assert engine.simulate(trajectory) == (WALL, 1)
+    outcome, index = engine.simulate_batch([trajectory])
+    assert (outcome[0], index[0]) == (WALL, 1)
@@ -0,0 +1,16 @@
+import pytest
+
+import maze_generator
+
+
+@pytest.mark.parametrize("size", [(16, 16), (200, 200), (15, 20)])
+def test_even_sizes_are_solvable(size):
+    grid, start, goal, dist, metrics = maze_generator.generate_for_difficulty("hard", seed=1, size=size)
+    assert grid.shape == tuple(n | 1 for n in size)
+    assert goal == (grid.shape[0] - 1, grid.shape[1] - 1)
+    assert metrics["solvable"] and dist[start] > 0
+
+
+def test_no_attempts_raises():
+    with pytest.raises(ValueError):
+        maze_generator.generate_for_difficulty("easy", attempts=0)
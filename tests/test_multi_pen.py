@@ -0,0 +1,39 @@
+import cv2
+import numpy as np
+
+from color_labeler import ColorLabeler
+from multi_pen import MultiPenTracker
+
+
+def test_assign_after_clear():
+    tracker = MultiPenTracker()
+    tracker.assign([(10, 10), (200, 200)], [None, None])
+    tracker.assign([(12, 11), (198, 202)], [None, None])
+    tracker.clear()
+    pens = tracker.assign([(14, 12)], [None])
+    assert [pen.position for pen in pens] == [(14, 12)]
+
+
+def test_pens_keep_identity():
+    tracker = MultiPenTracker()
+    first = [pen.id for pen in tracker.assign([(10, 10), (200, 200)], [None, None])]
+    pens = tracker.assign([(205, 198), (13, 12)], [None, None])
+    assert [pen.id for pen in pens] == first
+    assert [pen.position for pen in pens] == [(13, 12), (205, 198)]
+
+
+def test_pens_of_different_colors_are_tracked_together():
+    frame = np.zeros((240, 320, 3), np.uint8)
+    for x, bgr in ((60, (0, 0, 220)), (160, (0, 220, 0)), (260, (220, 0, 0))):
+        cv2.circle(frame, (x, 120), 20, bgr, -1)
+    tracker = MultiPenTracker(ColorLabeler())
+    pens = tracker.update(frame)
+    assert sorted(pen.label for pen in pens) == ["blue", "green", "red"]
+
+
+def test_slots_are_bounded_and_reused():
+    tracker = MultiPenTracker(max_pens=2, max_misses=0)
+    for k in range(50):
+        pens = tracker.assign([(10 + 300 * (k % 2), 10)], [None])
+        assert all(0 <= pen.slot < 2 for pen in pens)
+    assert tracker.next_id > 2
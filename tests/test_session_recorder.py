@@ -0,0 +1,13 @@
+import pytest
+
+from session_recorder import SessionRecorder, SessionReplay
+
+
+def test_out_of_range_pen_is_rejected(tmp_path):
+    path = str(tmp_path / "s.vps")
+    recorder = SessionRecorder(path)
+    recorder.point((1, 2), "#ff0000", pen=8)
+    with pytest.raises(ValueError):
+        recorder.point((1, 2), "#ff0000", pen=300)
+    recorder.close()
+    assert [int(r["pen"]) for r in SessionReplay(path).records] == [8]
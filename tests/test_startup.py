@@ -0,0 +1,41 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Presupuestos de arranque en milisegundos; el de la ventana es el de benchmark.py --startup-budget
+IMPORT_BUDGET_MS = 200
+WINDOW_BUDGET_MS = 400
+
+
+def run_python(code):
+    # En otro proceso: aquí otras pruebas ya importaron NumPy y OpenCV
+    result = subprocess.run([sys.executable, "-c", code], cwd=ROOT, check=True,
+                            stdout=subprocess.PIPE, universal_newlines=True)
+    return result.stdout.strip()
+
+
+def test_import_does_not_load_the_vision_stack():
+    code = ("import sys, VirtualPen; "
+            "print(sorted(m for m in ('cv2', 'numpy', 'imutils') if m in sys.modules))")
+    assert run_python(code) == "[]"
+
+
+def test_import_fits_the_budget():
+    code = ("import time; t = time.perf_counter(); import VirtualPen; "
+            "print((time.perf_counter() - t) * 1000.0)")
+    # La mejor de tres mediciones, para no depender de un proceso lento aislado
+    elapsed = min(float(run_python(code)) for _ in range(3))
+    assert elapsed <= IMPORT_BUDGET_MS
+
+
+@pytest.mark.skipif(sys.platform.startswith("linux") and not os.environ.get("DISPLAY"),
+                    reason="la ventana de Tk necesita un DISPLAY")
+def test_window_fits_the_budget():
+    script = os.path.join(ROOT, "VirtualPen.py")
+    result = subprocess.run([sys.executable, script, "--startup-check", str(WINDOW_BUDGET_MS)],
+                            cwd=ROOT, stdout=subprocess.PIPE, universal_newlines=True)
+    assert result.returncode == 0, result.stdout
@@ -0,0 +1,23 @@
+import numpy as np
+
+import tracker
+from trail_renderer import Trail, TrailLayer
+
+
+def test_layer_matches_draw_trail():
+    rng = np.random.default_rng(0)
+    pts = Trail()
+    layer = TrailLayer()
+    p = np.array([160.0, 120.0])
+    for f in range(1300):
+        p = np.clip(p + rng.normal(0, 6, 2), -10, 330)
+        pts.appendleft(None if rng.random() < 0.03 else (int(p[0]), int(p[1])))
+        if f == 1100:
+            pts.clear()
+        if f % 400 == 7:
+            pts.appendleft((int(p[0]), int(p[1])))  # Dos puntos en un mismo cuadro
+        expected = np.zeros((240, 320, 3), np.uint8)
+        actual = expected.copy()
+        tracker.draw_trail(expected, pts, (0, 0, 255))
+        layer.render(actual, pts, (0, 0, 255))
+        assert np.array_equal(actual, expected), f
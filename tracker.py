@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Funciones de procesamiento de cuadros para el lápiz virtual
+"""
+
+import numpy as np
+import cv2
+import imutils
+
+from profiler import PROFILER
+
+# Ancho al que se redimensiona cada cuadro y largo de la estela
+FRAME_WIDTH = 600
+TRAIL_LENGTH = 1024
+
+# Grosor de cada segmento de la estela según su antigüedad
+TRAIL_THICKNESS = [int(np.sqrt(TRAIL_LENGTH / float(i + 1)) * 2.5) for i in range(TRAIL_LENGTH)]
+
+
+def prepare_frame(frame, width=FRAME_WIDTH):
+    """Voltea el cuadro como espejo y lo redimensiona."""
+    with PROFILER.section("preparar"):
+        frame = cv2.flip(frame, 1)
+        return imutils.resize(frame, width=width)
+
+
+def segment(frame, lower, upper):
+    """Devuelve la máscara del color buscado dentro del cuadro."""
+    with PROFILER.section("desenfoque"):
+        blurred = cv2.GaussianBlur(frame, (11, 11), 0)
+    with PROFILER.section("umbral"):
+        hsv = cv2.cvtColor(blurred, cv2.COLOR_BGR2HSV)
+        mask = cv2.inRange(hsv, lower, upper)
+    with PROFILER.section("morfologia"):
+        mask = cv2.erode(mask, None, iterations=2)
+        return cv2.dilate(mask, None, iterations=2)
+
+
+def threshold(frame, lower, upper):
+    """Máscara del color sin desenfoque ni morfología (para cuadros reducidos)."""
+    with PROFILER.section("umbral"):
+        hsv = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)
+        return cv2.inRange(hsv, lower, upper)
+
+
+def segment_lut(frame, segmenter, name):
+    """Como segment, pero con una tabla de consulta en vez de cvtColor e inRange."""
+    with PROFILER.section("desenfoque"):
+        blurred = cv2.GaussianBlur(frame, (11, 11), 0)
+    with PROFILER.section("umbral"):
+        mask = segmenter.mask(blurred, name)
+    with PROFILER.section("morfologia"):
+        mask = cv2.erode(mask, None, iterations=2)
+        return cv2.dilate(mask, None, iterations=2)
+
+
+def find_contours(mask, copy=True):
+    """Devuelve los contornos externos de la máscara (sobre una copia si copy)."""
+    with PROFILER.section("contornos"):
+        cnts = cv2.findContours(mask.copy() if copy else mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        return imutils.grab_contours(cnts)
+
+
+def contour_center(c):
+    """Centro de masa de un contorno, o None si no tiene área."""
+    M = cv2.moments(c)
+    if M["m00"] == 0:
+        return None
+    return (int(M["m10"] / M["m00"]), int(M["m01"] / M["m00"]))
+
+
+def find_center(mask):
+    """Devuelve el centro del contorno más grande de la máscara, o None."""
+    cnts = find_contours(mask)
+    if len(cnts) == 0:
+        return None
+
+    c = max(cnts, key=cv2.contourArea)
+    return contour_center(c)
+
+
+def draw_trail(frame, pts, color):
+    """Dibuja la estela del lápiz con grosor decreciente."""
+    for i in range(1, len(pts)):
+        if pts[i - 1] is None or pts[i] is None:
+            continue
+        cv2.line(frame, pts[i - 1], pts[i], color, TRAIL_THICKNESS[i])
@@ -0,0 +1,448 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Servidor de seguimiento: un proceso por cámara, cuadros y resultados en anillos
+de memoria compartida y posiciones publicadas a los clientes por un socket local
+
+Ejemplo: python3 tracking_server.py --camera 0 --camera 1
+         python3 tracking_server.py --camera synthetic --camera synthetic --seconds 10
+         python3 tracking_server.py --client
+"""
+
+import argparse
+import json
+import multiprocessing as mp
+import queue
+import socket
+import struct
+import time
+from multiprocessing import resource_tracker, shared_memory
+import numpy as np
+
+from hsv_profile import load_profile
+
+ADDRESS = ("127.0.0.1", 5055)
+LOWER = (100, 150, 50)
+UPPER = (140, 255, 255)
+
+# Resultado de un cuadro en el anillo de resultados; x e y en NaN si no se encontró el lápiz
+RESULT = np.dtype([("seq", "<i8"), ("t", "<f8"), ("x", "<f4"), ("y", "<f4")])
+
+# Mensaje a los clientes: cámara, secuencia, hora (epoch), x, y
+UPDATE = struct.Struct("<BIdff")
+# El saludo al conectarse es JSON precedido por su largo
+LENGTH = struct.Struct("<I")
+
+
+class SharedRing:
+    """Anillo de slots de tamaño fijo en memoria compartida: un escritor, varios lectores.
+
+    La cabecera guarda cuántos elementos se escribieron y la secuencia de cada
+    slot. El escritor marca el slot con -1 mientras lo llena; el lector copia
+    el slot y vuelve a mirar la secuencia para descartar una lectura pisada.
+    """
+
+    def __init__(self, name=None, shape=(), dtype=np.uint8, slots=4, create=False, track=True):
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        self.slots = slots
+        header = 8 * (1 + slots)
+        size = header + slots * self.dtype.itemsize * int(np.prod(self.shape))
+        if create:
+            self.shm = shared_memory.SharedMemory(create=True, size=size)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+            if not track:
+                # Un proceso ajeno al servidor tiene su propio resource_tracker, que
+                # borraría el segmento al salir aunque el servidor lo siga usando
+                resource_tracker.unregister(self.shm._name, "shared_memory")
+        self.owner = create
+        self.header = np.ndarray((1 + slots,), np.int64, self.shm.buf)
+        self.data = np.ndarray((slots,) + self.shape, self.dtype, self.shm.buf, offset=header)
+        if create:
+            self.header[0] = 0
+            self.header[1:] = -1
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def describe(self):
+        """Lo necesario para abrir el anillo desde otro proceso."""
+        return {"name": self.name, "shape": list(self.shape), "dtype": self.dtype.str, "slots": self.slots}
+
+    @property
+    def count(self):
+        """Total de elementos escritos; el último es count - 1."""
+        return int(self.header[0])
+
+    def slot(self):
+        """Slot donde escribir el próximo elemento, sin copiar; se confirma con commit."""
+        count = self.header[0]
+        self.header[1 + count % self.slots] = -1
+        return self.data[count % self.slots]
+
+    def commit(self):
+        """Publica el slot devuelto por slot() y devuelve su secuencia."""
+        count = int(self.header[0])
+        self.header[1 + count % self.slots] = count
+        self.header[0] = count + 1
+        return count
+
+    def read(self, seq, out=None):
+        """Copia el elemento seq; None si ya se sobrescribió o todavía no existe."""
+        index = seq % self.slots
+        if self.header[1 + index] != seq:
+            return None
+        if out is None:
+            out = self.data[index].copy()
+        else:
+            np.copyto(out, self.data[index])
+        if self.header[1 + index] != seq:
+            return None
+        return out
+
+    def latest(self, out=None):
+        """(secuencia, copia) del último elemento, o None si no hay ninguno legible."""
+        seq = self.count - 1
+        if seq < 0:
+            return None
+        item = self.read(seq, out)
+        return None if item is None else (seq, item)
+
+    def close(self):
+        # Las vistas de numpy deben soltarse antes de cerrar el segmento
+        self.header = self.data = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+def camera_worker(index, spec, lower, upper, coarse_width, results_info, ready, updates, stop,
+                  frame_slots=4):
+    """Proceso de una cámara: captura, prepara en memoria compartida, busca el lápiz y publica."""
+    import cv2
+    from frame_sources import open_source
+    from frame_buffers import FrameBuffers
+    from coarse_to_fine import CoarseToFine
+    import tracker
+
+    # Un núcleo por cámara: que los hilos de OpenCV no compitan con los otros procesos
+    cv2.setNumThreads(1)
+    results = SharedRing(results_info["name"], (), RESULT, results_info["slots"])
+    buffers = FrameBuffers()
+    searcher = CoarseToFine(coarse_width) if coarse_width else None
+    frames = None
+    source = None
+
+    def segment(region):
+        return buffers.segment(region, lower, upper)
+
+    def threshold(region):
+        return tracker.threshold(region, lower, upper)
+
+    try:
+        source = open_source(spec, loop=True)
+        while not stop.is_set():
+            item = source.read(buffers.raw_buffer())
+            if item is None:
+                time.sleep(0.01)
+                continue
+            raw = item[0]
+            t = time.time()
+            if frames is None:
+                frames = SharedRing(shape=buffers.prepared_shape(raw.shape), slots=frame_slots, create=True)
+                ready.put((index, frames.describe(), None))
+
+            frame = buffers.prepare(raw, out=frames.slot())
+            seq = frames.commit()
+            if searcher is not None:
+                center = searcher.locate(frame, threshold, segment)
+            else:
+                center = buffers.find_center(segment(frame))
+
+            record = results.slot()
+            record["seq"], record["t"] = seq, t
+            record["x"], record["y"] = center if center is not None else (np.nan, np.nan)
+            results.commit()
+            updates.set()
+    except Exception as e:
+        if frames is None:
+            ready.put((index, None, "%s: %s" % (type(e).__name__, e)))
+        raise
+    finally:
+        if source is not None:
+            source.release()
+        if frames is not None:
+            frames.close()
+        results.close()
+
+
+class _Client:
+    """Conexión de un cliente; los mensajes que no entran en el socket esperan en pending."""
+
+    def __init__(self, sock, limit=64 * UPDATE.size):
+        self.sock = sock
+        self.pending = bytearray()
+        self.limit = limit  # Con más atraso se descartan posiciones: sólo importan las nuevas
+        self.dropped = 0
+
+    def send(self, data):
+        """Encola data entera (o la descarta) y manda lo que se pueda sin bloquear."""
+        if len(self.pending) + len(data) <= self.limit:
+            self.pending += data
+        else:
+            self.dropped += 1
+        try:
+            sent = self.sock.send(self.pending)
+        except BlockingIOError:
+            return
+        del self.pending[:sent]
+
+
+class TrackingServer:
+    """Lanza un proceso por cámara y reparte sus posiciones a los clientes del socket."""
+
+    def __init__(self, sources, address=ADDRESS, lower=LOWER, upper=UPPER, coarse_width=None,
+                 result_slots=256):
+        self.sources = [str(s) for s in sources]
+        self.address = address
+        self.lower, self.upper = tuple(lower), tuple(upper)
+        self.coarse_width = coarse_width
+        self.result_slots = result_slots
+        self.context = mp.get_context("spawn")
+        self.stop_event = self.context.Event()
+        self.updates = self.context.Event()
+        self.workers = []
+        self.results = []
+        self.frames = []  # Descripción del anillo de cuadros de cada cámara
+        self.next_seq = []
+        self.counts = []
+        self.misses = []
+        self.clients = []
+        self.listener = None
+        self.started = None
+
+    def start(self, timeout=10.0):
+        ready = self.context.Queue()
+        for index, spec in enumerate(self.sources):
+            results = SharedRing(shape=(), dtype=RESULT, slots=self.result_slots, create=True)
+            worker = self.context.Process(
+                target=camera_worker, name="camera-%d" % index, daemon=True,
+                args=(index, spec, self.lower, self.upper, self.coarse_width, results.describe(),
+                      ready, self.updates, self.stop_event))
+            worker.start()
+            self.results.append(results)
+            self.workers.append(worker)
+        self.frames = [None] * len(self.sources)
+        self.next_seq = [0] * len(self.sources)
+        self.counts = [0] * len(self.sources)
+        self.misses = [0] * len(self.sources)
+
+        # Esperar el primer cuadro de cada cámara: recién ahí se conoce su tamaño
+        deadline = time.time() + timeout
+        for _ in self.sources:
+            try:
+                index, info, error = ready.get(timeout=max(0.0, deadline - time.time()))
+            except queue.Empty:
+                self.stop()
+                raise RuntimeError("Alguna cámara no entregó cuadros en %.0f s" % timeout)
+            if error is not None:
+                self.stop()
+                raise RuntimeError("Cámara %s: %s" % (self.sources[index], error))
+            self.frames[index] = info
+
+        self.listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.listener.bind(self.address)
+        self.listener.listen()
+        self.listener.setblocking(False)
+        self.started = time.perf_counter()
+        return self
+
+    def hello(self):
+        """Saludo para un cliente nuevo: cámaras, anillos de cuadros y formato de los mensajes."""
+        cameras = [{"index": i, "source": spec, "frames": info}
+                   for i, (spec, info) in enumerate(zip(self.sources, self.frames))]
+        payload = json.dumps({"cameras": cameras, "update": UPDATE.format}).encode()
+        return LENGTH.pack(len(payload)) + payload
+
+    def _accept(self):
+        while True:
+            try:
+                sock, _ = self.listener.accept()
+            except BlockingIOError:
+                return
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            # El saludo va completo y bloqueando; después, nada puede frenar al servidor
+            sock.sendall(self.hello())
+            sock.setblocking(False)
+            self.clients.append(_Client(sock))
+
+    def _collect(self):
+        """Mensajes de todos los resultados nuevos de cada cámara."""
+        messages = []
+        for camera, results in enumerate(self.results):
+            count = results.count
+            # Si el servidor se atrasó más que el anillo, saltar a lo que sigue disponible
+            seq = max(self.next_seq[camera], count - results.slots)
+            for seq in range(seq, count):
+                record = results.read(seq)
+                if record is None:
+                    continue
+                self.counts[camera] += 1
+                if np.isnan(record["x"]):
+                    self.misses[camera] += 1
+                messages.append(UPDATE.pack(camera, int(record["seq"]) & 0xFFFFFFFF, float(record["t"]),
+                                            float(record["x"]), float(record["y"])))
+            self.next_seq[camera] = count
+        return b"".join(messages)
+
+    def _publish(self, data):
+        for client in list(self.clients):
+            try:
+                client.send(data)
+            except OSError:
+                client.sock.close()
+                self.clients.remove(client)
+
+    def serve(self, seconds=None):
+        """Atiende hasta que se pida parar, se cumplan seconds o muera un proceso de cámara."""
+        deadline = None if seconds is None else time.perf_counter() + seconds
+        try:
+            while deadline is None or time.perf_counter() < deadline:
+                # Limpiar antes de leer: un aviso que llega durante la lectura despierta la próxima vuelta
+                if self.updates.wait(0.1):
+                    self.updates.clear()
+                self._accept()
+                data = self._collect()
+                if data:
+                    self._publish(data)
+                if not all(worker.is_alive() for worker in self.workers):
+                    break
+        except KeyboardInterrupt:
+            pass
+        return self.report()
+
+    def report(self):
+        elapsed = time.perf_counter() - self.started if self.started else 0.0
+        return [{"source": spec, "frames": count, "misses": misses,
+                 "fps": count / elapsed if elapsed else 0.0}
+                for spec, count, misses in zip(self.sources, self.counts, self.misses)]
+
+    def stop(self):
+        self.stop_event.set()
+        for worker in self.workers:
+            worker.join(2.0)
+            if worker.is_alive():
+                worker.terminate()
+        for client in self.clients:
+            client.sock.close()
+        self.clients = []
+        if self.listener is not None:
+            self.listener.close()
+            self.listener = None
+        for results in self.results:
+            results.close()
+        self.results = []
+
+
+class TrackingClient:
+    """Cliente del servidor: recibe las posiciones y puede abrir los cuadros de una cámara."""
+
+    def __init__(self, address=ADDRESS, timeout=5.0):
+        self.sock = socket.create_connection(address, timeout)
+        self.sock.settimeout(None)
+        length = LENGTH.unpack(self._recv_exactly(LENGTH.size))[0]
+        self.info = json.loads(self._recv_exactly(length).decode())
+        self.buffer = b""
+
+    def _recv_exactly(self, size):
+        data = b""
+        while len(data) < size:
+            chunk = self.sock.recv(size - len(data))
+            if not chunk:
+                raise ConnectionError("El servidor cerró la conexión")
+            data += chunk
+        return data
+
+    @property
+    def cameras(self):
+        return self.info["cameras"]
+
+    def updates(self, timeout=None):
+        """Genera (cámara, secuencia, hora, (x, y) o None) hasta que el servidor cierre.
+
+        Con timeout, genera None cada vez que pasan timeout segundos sin datos,
+        para que quien lee pueda decidir si sigue esperando.
+        """
+        self.sock.settimeout(timeout)
+        while True:
+            try:
+                data = self.sock.recv(4096)
+            except socket.timeout:
+                yield None
+                continue
+            if not data:
+                return
+            self.buffer += data
+            usable = len(self.buffer) // UPDATE.size * UPDATE.size
+            for camera, seq, t, x, y in UPDATE.iter_unpack(self.buffer[:usable]):
+                yield camera, seq, t, (None if np.isnan(x) else (x, y))
+            self.buffer = self.buffer[usable:]
+
+    def open_frames(self, camera):
+        """Anillo de cuadros preparados de la cámara, sin copias entre procesos."""
+        info = self.cameras[camera]["frames"]
+        return SharedRing(info["name"], info["shape"], info["dtype"], info["slots"], track=False)
+
+    def close(self):
+        self.sock.close()
+
+
+def parse_address(text):
+    host, _, port = text.rpartition(":")
+    return host or ADDRESS[0], int(port)
+
+
+def get_arguments():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--camera', action='append', default=[],
+                    help='Camera index, "synthetic" or a video file; repeat for several cameras')
+    ap.add_argument('--address', default="%s:%d" % ADDRESS, help='host:port to listen on or connect to')
+    ap.add_argument('--coarse', type=int, metavar='WIDTH',
+                    help='Use coarse-to-fine segmentation at this width')
+    ap.add_argument('--seconds', type=float, help='Stop after this many seconds and print the throughput')
+    ap.add_argument('--client', action='store_true', help='Connect to a running server and print positions')
+    return vars(ap.parse_args())
+
+
+def main():
+    args = get_arguments()
+    address = parse_address(args['address'])
+    if args['client']:
+        client = TrackingClient(address)
+        print("Cámaras: %s" % ", ".join(c["source"] for c in client.cameras))
+        try:
+            for camera, seq, t, position in client.updates():
+                print("%d %8d %.3f %s" % (camera, seq, t, position))
+        except KeyboardInterrupt:
+            pass
+        client.close()
+        return
+
+    profile = load_profile()
+    lower, upper = profile if profile is not None else (LOWER, UPPER)
+    server = TrackingServer(args['camera'] or ["0"], address, lower, upper, args['coarse']).start()
+    print("Escuchando en %s:%d con %d cámara(s)" % (address + (len(server.sources),)))
+    try:
+        report = server.serve(args['seconds'])
+    finally:
+        server.stop()
+    for camera in report:
+        print("  %-10s %6d cuadros  %6.1f fps  %d sin lápiz" %
+              (camera["source"], camera["frames"], camera["fps"], camera["misses"]))
+
+
+if __name__ == '__main__':
+    main()
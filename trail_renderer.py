@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Capa persistente para dibujar la estela del lápiz de forma incremental
+"""
+
+from collections import deque
+import numpy as np
+import cv2
+
+from tracker import TRAIL_LENGTH, TRAIL_THICKNESS
+
+THICKNESS = np.array(TRAIL_THICKNESS)
+# Índices donde un segmento cambia de grosor al envejecer un cuadro
+BANDS = np.flatnonzero(THICKNESS[2:] != THICKNESS[1:-1]) + 2
+
+
+class Trail(deque):
+    """Puntos de la estela (el más nuevo primero) que cuentan lo que se les agrega.
+
+    Con los contadores, TrailLayer sabe qué cambió desde el último cuadro
+    sin copiar ni comparar los puntos.
+    """
+
+    def __init__(self, maxlen=TRAIL_LENGTH):
+        super().__init__(maxlen=maxlen)
+        self.added = 0
+        self.cleared = 0
+
+    def appendleft(self, point):
+        super().appendleft(point)
+        self.added += 1
+
+    def clear(self):
+        super().clear()
+        self.cleared += 1
+
+
+class TrailLayer:
+    """Estela en un conteo persistente: a cada cuadro sólo se tocan los segmentos que cambian.
+
+    count[y, x] dice cuántos segmentos, cada uno con el grosor que le toca
+    por su antigüedad, cubren el píxel. Al llegar un punto entra un segmento,
+    sale el más viejo y sólo los que cruzan un límite de grosor se
+    redibujan; la estela es count > 0, igual píxel a píxel a draw_trail.
+    Con un Trail el avance se lee de sus contadores; con otro contenedor se
+    reconstruye en cada cuadro.
+    """
+
+    def __init__(self, max_shift=4):
+        self.max_shift = max_shift  # Puntos nuevos por cuadro antes de reconstruir todo
+        self.count = None
+        self.mask = None
+        self.color = None
+        self.color_image = None
+        # Recuadro de _stamp; sólo crece y es uint16 como count, para sumar sin conversiones
+        self.scratch = np.empty(0, dtype=np.uint16)
+        self.drawn = deque()  # Puntos que ya están en count
+        self.seen = None  # (agregados, limpiezas) del Trail en el último cuadro
+
+    def _stamp(self, p0, p1, thickness, delta):
+        """Suma (o resta) al conteo el segmento p0-p1 dibujado en su recuadro."""
+        if p0 is None or p1 is None:
+            return
+        h, w = self.count.shape
+        pad = thickness + 2
+        x0, y0 = max(min(p0[0], p1[0]) - pad, 0), max(min(p0[1], p1[1]) - pad, 0)
+        x1, y1 = min(max(p0[0], p1[0]) + pad + 1, w), min(max(p0[1], p1[1]) + pad + 1, h)
+        if x0 >= x1 or y0 >= y1:
+            return
+        size = (y1 - y0) * (x1 - x0)
+        if self.scratch.size < size:
+            self.scratch = np.empty(size, dtype=np.uint16)
+        stamp = self.scratch[:size].reshape(y1 - y0, x1 - x0)
+        stamp.fill(0)
+        cv2.line(stamp, (p0[0] - x0, p0[1] - y0), (p1[0] - x0, p1[1] - y0), 1, thickness)
+        # OpenCV escribe en la vista del conteo sin la copia que haría numpy
+        roi = self.count[y0:y1, x0:x1]
+        if delta > 0:
+            cv2.add(roi, stamp, dst=roi)
+        else:
+            cv2.subtract(roi, stamp, dst=roi)
+
+    def _rebuild(self, shape, pts):
+        if self.count is None or self.count.shape != shape:
+            self.count = np.zeros(shape, dtype=np.uint16)
+            self.mask = np.empty(shape, dtype=np.uint8)
+            self.color_image = np.empty(shape + (3,), dtype=np.uint8)
+            self.color = None
+        else:
+            self.count.fill(0)
+        self.drawn = deque(pts, maxlen=getattr(pts, "maxlen", None))
+        for i in range(1, len(self.drawn)):
+            self._stamp(self.drawn[i - 1], self.drawn[i], TRAIL_THICKNESS[i], 1)
+
+    def _shift(self, pts):
+        """Cuántos puntos se agregaron por delante desde el último cuadro, o None."""
+        if not isinstance(pts, Trail) or self.seen is None or pts.cleared != self.seen[1]:
+            return None
+        k = pts.added - self.seen[0]
+        if not 0 <= k <= self.max_shift or len(pts) != min(len(self.drawn) + k, pts.maxlen):
+            return None
+        return k
+
+    def _update(self, pts, k):
+        old, last = self.drawn, len(pts)
+        # Los segmentos viejos que ya no caben en pts salen con su grosor anterior
+        for j in range(max(last - k, 1), len(old)):
+            self._stamp(old[j - 1], old[j], TRAIL_THICKNESS[j], -1)
+        if not k:
+            return
+        for i in range(k - 1, -1, -1):
+            old.appendleft(pts[i])
+        # Los que cruzan un límite de grosor se redibujan con el nuevo
+        if k == 1:
+            moved = BANDS if last == len(THICKNESS) else BANDS[BANDS < last]
+        else:
+            moved = np.flatnonzero(THICKNESS[k + 1:last] != THICKNESS[1:last - k]) + k + 1
+        for i in moved:
+            a, b = old[i - 1], old[i]
+            self._stamp(a, b, TRAIL_THICKNESS[i - k], -1)
+            self._stamp(a, b, TRAIL_THICKNESS[i], 1)
+        # Segmentos nuevos de la cabeza
+        for i in range(1, min(k, last - 1) + 1):
+            self._stamp(old[i - 1], old[i], TRAIL_THICKNESS[i], 1)
+
+    def render(self, frame, pts, color):
+        """Dibuja la estela de pts sobre el cuadro."""
+        shape = frame.shape[:2]
+        k = None if self.count is None or self.count.shape != shape else self._shift(pts)
+        if k is None:
+            # Limpieza, cambio de tamaño o demasiados puntos nuevos: reconstruir
+            self._rebuild(shape, pts)
+        else:
+            self._update(pts, k)
+        if isinstance(pts, Trail):
+            self.seen = (pts.added, pts.cleared)
+
+        if color != self.color:
+            self.color_image[:] = color
+            self.color = color
+
+        # Componer la capa en una sola operación vectorizada
+        cv2.compare(self.count, 0, cv2.CMP_GT, dst=self.mask)
+        cv2.copyTo(self.color_image, self.mask, frame)
+
+    def clear(self):
+        self.count = None
+        self.drawn = deque()
+        self.seen = None